@@ -8,232 +8,252 @@ Keywords and sentiment indicators are calibrated from real frequency
 analysis of 2000 conversation summaries and transcripts.
 
 Usage:
-    python scripts/analyze_conversations.py
+    python scripts/analyze_conversations.py [--input FILE] [--limit N] [--workers N]
+                                            [--cache FILE] [--results FILE]
+                                            [--transcript-budget CHARS] [--msgpack]
+                                            [--metrics FILE] [--run-report FILE]
+                                            [--log-level LEVEL]
+                                            [--dedup exact|near] [--count-duplicates]
+    python scripts/analyze_conversations.py --watch DIR [--workers N] [--cache FILE]
+    python scripts/analyze_conversations.py --from-results FILE
+    python scripts/analyze_conversations.py --rebuild-lexicon
+
+Lexicon tables live in scripts/lexicon/lexicon.json; the compiled phrase
+matcher is cached next to it (lexicon/.compiled/) and rebuilt automatically
+when the file changes.
+
+The input may be a JSON array of conversations or JSON Lines (one
+conversation per line); both are read incrementally. Every
+transcript_speaker_N field is scored: speaker 1 as the customer, the
+others as agents, with per-speaker scores and the customer's sentiment
+trajectory (opening vs closing turns) kept in the result store. The
+overall sentiment and keywords only read the customer's transcript.
 """
 
+import argparse
+import asyncio
+import gzip
+import hashlib
+import heapq
 import json
+import math
 import os
+import pickle
 import re
-from collections import Counter, defaultdict
+import shutil
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from itertools import islice
+from operator import itemgetter
+
+try:
+    import numpy as np
+except ImportError:  # analyze_batch falls back to array.array
+    np = None
+
+try:
+    import brotli
+except ImportError:  # .br siblings are skipped
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # --msgpack is unavailable
+    msgpack = None
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.join(SCRIPT_DIR, '..')
 INPUT_FILE = os.path.join(PROJECT_ROOT, 'sample-data', 'gramaide.conversations.json')
 OUTPUT_DIR = os.path.join(PROJECT_ROOT, 'public', 'mocked-api')
 MAX_CONVERSATIONS = 10000
+CONVERSATION_PAGE_SIZE = 500  # conversations per page file
+CONVERSATION_PAGES_DIR = 'conversations_dpd'
+CONVERSATION_INDEX_FIELDS = ('id', 'date', 'sentiment', 'themes', 'site')
+FILTER_INDEX_FIELDS = ('sentiment', 'theme', 'keyword', 'site', 'agent_id', 'month')
+MANIFEST_FILE = 'manifest_dpd.json'
+OUTPUT_VARIANTS = ('gz', 'br', 'msgpack')  # sibling files written next to each JSON output
+GENERATIONS_DIR = 'generations'  # complete output sets, one directory per run
+GENERATIONS_KEPT = 3             # older generations are deleted after a publish
+OUTPUT_WRITERS = 4               # threads serializing and compressing output files
 
 
-# ─── Sentiment Analysis Engine ───────────────────────────────────────────────
+# ─── Lexicon ─────────────────────────────────────────────────────────────────
 
-# Weighted negative indicators (word/phrase -> weight)
-NEGATIVE_INDICATORS = {
-    # Strong negative (weight 3)
-    'frustration': 3, 'furieux': 3, 'furieuse': 3, 'scandaleux': 3,
-    'inadmissible': 3, "n'importe quoi": 3, 'insulte': 3, 'insulter': 3,
-    'inapproprie': 3, 'inacceptable': 3, 'deplorable': 3,
-    'mecontentement': 3, 'mecontent': 3, 'mecontente': 3,
-    'colere': 3, 'enerve': 3, 'enervee': 3, 'agace': 3,
-    'excede': 3, 'excedee': 3, 'exaspere': 3, 'exasperee': 3,
-    'vol': 3, 'vole': 3,
-
-    # Medium negative (weight 2)
-    'deception': 2, 'decu': 2, 'decue': 2, 'decoit': 2,
-    'reclamation': 2, 'litige': 2, 'plainte': 2,
-    'retard': 2, 'retards': 2, 'retarde': 2,
-    'echoue': 2, 'echec': 2, 'echouee': 2,
-    'perdu': 2, 'perte': 2, 'perdue': 2, 'perdus': 2, 'egare': 2,
-    'endommage': 2, 'endommagee': 2, 'abime': 2, 'casse': 2, 'defectueux': 2,
-    'non livre': 2, 'non recu': 2, 'pas recu': 2, 'pas livre': 2,
-    'pas receptionne': 2, 'non receptionne': 2,
-    'conteste': 2, 'contestation': 2,
-    'probleme recurrent': 2, 'recurrent': 2, 'recurrents': 2,
-    'infructueux': 2, 'infructueuse': 2, 'infructueuses': 2,
-    'reporte a plusieurs reprises': 2,
-    'livraison manquee': 2,
-    'erreur': 2,
-
-    # Light negative (weight 1)
-    'probleme': 1, 'incident': 1, 'difficulte': 1, 'difficultes': 1,
-    'absence': 1, 'absent': 1, 'absente': 1,
-    'injoignable': 1,
-    'inquietude': 1, 'inquiete': 1, 'inquiet': 1,
-    'confusion': 1, 'confus': 1, 'confuse': 1,
-    'attente': 1, 'attend depuis': 1,
-    'reporte': 1, 'reportee': 1,
-    'incomplete': 1, 'incomplet': 1,
-    'incorrecte': 1, 'incorrect': 1, 'erronee': 1, 'errone': 1,
-    'bloque': 1, 'bloquee': 1,
-    'retourne a l\'expediteur': 1,
-    'impossible': 1,
-}
+LEXICON_DIR = os.path.join(SCRIPT_DIR, 'lexicon')
+LEXICON_FILE = os.path.join(LEXICON_DIR, 'lexicon.json')
+COMPILED_LEXICON_DIR = os.path.join(LEXICON_DIR, '.compiled')
+
+
+def load_lexicon(path=LEXICON_FILE):
+    """Read a lexicon data file. Returns (version, content hash, {table: entries}).
+
+    The file holds every phrase table and the summary rules, each with a
+    description; ``version`` is bumped by whoever edits it.
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    lexicon = json.loads(raw.decode('utf-8'))
+    tables = {name: table['entries'] for name, table in lexicon['tables'].items()}
+    return lexicon['version'], hashlib.sha256(raw).hexdigest()[:16], tables
 
-# Weighted positive indicators
-POSITIVE_INDICATORS = {
-    # Strong positive (weight 3)
-    'satisfait': 3, 'satisfaite': 3, 'satisfaction': 3,
-    'remercie': 3, 'remerciement': 3, 'remercier': 3,
-    'excellent': 3, 'parfait': 3, 'parfaite': 3,
-
-    # Medium positive (weight 2)
-    'resolu': 2, 'resolue': 2, 'resolution': 2,
-    'livre avec succes': 2, 'livraison reussie': 2,
-    'confirme': 2, 'confirmee': 2, 'confirmation': 2,
-    'bien recu': 2, 'bien livre': 2,
-    'prise en charge': 2,
-    'rassure': 2, 'rassuree': 2,
-
-    # Light positive (weight 1)
-    'disponible': 1, 'a confirme': 1,
-    'en cours de livraison': 1,
-    'organise': 1, 'organisee': 1,
-    'clarifie': 1, 'clarification': 1,
-    'accepte': 1, 'acceptee': 1,
-    'programme': 1, 'programmee': 1,
-}
 
+LEXICON_VERSION, LEXICON_HASH, _LEXICON = load_lexicon()
+
+# Weighted negative / positive indicators (word/phrase -> weight)
+NEGATIVE_INDICATORS = _LEXICON['negative_indicators']
+POSITIVE_INDICATORS = _LEXICON['positive_indicators']
 # Neutral/procedural indicators
-NEUTRAL_INDICATORS = [
-    "s'informer", "demande d'information", "obtenir des informations",
-    "statut", "suivi", "verifier", "confirmer",
-    "reprogrammer", "reprogrammation", "modifier l'adresse",
-    "changement d'adresse", "mise a jour",
-]
+NEUTRAL_INDICATORS = _LEXICON['neutral_indicators']
+# Transcript signals, scored at half weight
+TRANSCRIPT_NEGATIVE_INDICATORS = _LEXICON['transcript_negative_indicators']
+TRANSCRIPT_POSITIVE_INDICATORS = _LEXICON['transcript_positive_indicators']
+# Weighted regex rules on the normalized summary (see sentiment_scores)
+SUMMARY_RULES = tuple(_LEXICON['summary_rules'])
+THEME_PATTERNS = _LEXICON['theme_patterns']
+STOP_WORDS = set(_LEXICON['stop_words'])
+# Keyword trigger -> keyword
+KEYWORD_CANDIDATES = _LEXICON['keyword_candidates']
+
+
+# ─── Sentiment Analysis Engine ───────────────────────────────────────────────
+
+# Accented characters and ligatures folded to ASCII. Applied after lower(),
+# so uppercase forms (É, Ç, Œ, Æ, ...) are covered as well.
+ACCENT_FOLDS = {
+    'à': 'a', 'â': 'a', 'ä': 'a',
+    'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e',
+    'î': 'i', 'ï': 'i',
+    'ô': 'o', 'ö': 'o',
+    'ù': 'u', 'û': 'u', 'ü': 'u',
+    'ÿ': 'y',
+    'ç': 'c',
+    'œ': 'oe', 'æ': 'ae',
+}
 
 
 def normalize_text(text):
     """Normalize French text: lowercase, remove accents for matching."""
     text = text.lower()
-    replacements = {
-        'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e',
-        'à': 'a', 'â': 'a', 'ä': 'a',
-        'ù': 'u', 'û': 'u', 'ü': 'u',
-        'ô': 'o', 'ö': 'o',
-        'î': 'i', 'ï': 'i',
-        'ç': 'c', 'œ': 'oe',
-    }
-    for fr_char, en_char in replacements.items():
+    if text.isascii():
+        return text
+    # One str.replace per fold is a C-speed scan; str.translate is several
+    # times slower here since its non-ASCII path does a lookup per character
+    for fr_char, en_char in ACCENT_FOLDS.items():
         text = text.replace(fr_char, en_char)
     return text
 
 
-def analyze_sentiment(summary, transcript=''):
-    """Analyze sentiment from French summary + transcript. Returns (sentiment, confidence, neg_score, pos_score)."""
-    norm_summary = normalize_text(summary)
-    norm_transcript = normalize_text(transcript)
+def analyze_sentiment(summary, transcript='', budget=None):
+    """Analyze sentiment from French summary + transcript. Returns (sentiment, confidence, neg_score, pos_score).
+
+    transcript is the customer's transcript or a tuple of transcripts by
+    speaker (see speaker_transcripts). With a TranscriptBudget, only a
+    window of long transcripts is scanned for phrases.
+    """
+    text = SegmentedConversation(summary, transcript, budget)
+    neg_score, pos_score, neutral_hits, _, _ = sentiment_scores(text)
+    sentiment, confidence = classify_sentiment(neg_score, pos_score, neutral_hits)
+    return sentiment, confidence, neg_score, pos_score
+
+
+def sentiment_scores(text):
+    """Lexicon scores of a SegmentedConversation:
+    (neg_score, pos_score, neutral_hits, speakers, trajectory).
+
+    neg_score and pos_score only count the customer's transcript; speakers
+    is (customer_neg, customer_pos, agent_neg, agent_pos), the transcript
+    scores of each speaker role, so the agents' are only reported there.
+    trajectory is one of TRAJECTORIES, or None without a customer transcript.
+    """
+    summary_hits = text.summary_hits
 
     neg_score = 0
     pos_score = 0
-    neutral_hits = 0
 
     # --- Score from SUMMARY (full weight) ---
-    for phrase, weight in NEGATIVE_INDICATORS.items():
-        count = norm_summary.count(normalize_text(phrase))
+    for _, weight, count in summary_hits['negative']:
         neg_score += count * weight
 
-    for phrase, weight in POSITIVE_INDICATORS.items():
-        count = norm_summary.count(normalize_text(phrase))
+    for _, weight, count in summary_hits['positive']:
         pos_score += count * weight
 
-    for phrase in NEUTRAL_INDICATORS:
-        if normalize_text(phrase) in norm_summary:
-            neutral_hits += 1
-
-    # Special summary patterns
-    if re.search(r'exprime?\s+(sa|son)\s+(frustration|mecontentement|colere|deception)', norm_summary):
-        neg_score += 4
-    if re.search(r'(quatrieme|troisieme|deuxieme|plusieurs)\s+fois', norm_summary):
-        neg_score += 2
-    if re.search(r'depuis\s+(plusieurs|deux|trois|quatre)\s+(jours|semaines|mois)', norm_summary):
-        neg_score += 1
-    if 'a plusieurs reprises' in norm_summary:
-        neg_score += 2
-
-    # Resolution modifiers in summary
-    if re.search(r'(a ete|a confirme|agent a|a informe|a organise|a pris en charge)', norm_summary):
-        if neg_score > 0:
-            pos_score += 1
-
-    # --- Score from TRANSCRIPT (raw customer voice, data-mined phrases) ---
-    if norm_transcript:
-        # Transcript negative signals (frequencies from 2000 real conversations)
-        transcript_neg = {
-            # Strong negative (3) - rare but unambiguous (2-40 occurrences)
-            'scandaleux': 3,           # 2x
-            'honteux': 3,              # 5x
-            'inadmissible': 3,         # 19x
-            "n'importe quoi": 3,       # 40x
-            'porter plainte': 3,       # 8x
-            'degoutee': 3, 'degoute': 3,  # 2x + 4x
-            'incompetent': 3,          # 12x
-            'cauchemar': 3,            # 2x
-            'ras le bol': 3,           # 11x
-            'c\'est la honte': 3,
-
-            # Medium negative (2) - moderately frequent signals
-            'c\'est pas normal': 2,    # 45x
-            'j\'en ai marre': 2,       # 15x
-            'incapable': 2,            # 11x
-            'je fais comment': 2,      # 36x
-            'c\'est nul': 2,           # 6x
-            'aucune nouvelle': 2,      # 23x
-            'galere': 2,               # 15x
-            'catastrophe': 2,          # 7x
-            'injoignable': 2,          # 13x
-            'c\'est abuser': 2,
-
-            # Light negative (1) - very frequent, weaker signal
-            'franchement': 1,          # 98x
-            'bloquee': 1,              # 24x
-            'bloque': 1,               # 125x (also used in neutral context)
-            'pire': 1,                 # 36x
-            'pas possible': 0.5,       # 200x (very common, often neutral)
-            'souci': 0.5,              # 558x in transcripts (common filler)
-        }
+    neutral_hits = len(summary_hits['neutral'])
 
-        # Transcript positive signals (frequencies from 2000 real conversations)
-        transcript_pos = {
-            # Strong positive (3) - genuine gratitude
-            'c\'est tres gentil': 3,       # 12x
-            'vous etes gentil': 3,         # 4x
-            'vous etes gentille': 3,       # 3x
-            'excellent': 2,                # 33x
-            'nickel': 2,                   # 20x
-            'genial': 2,                   # 19x
-
-            # Medium positive (1.5) - common but meaningful
-            'merci beaucoup': 1.5,         # 543x
-            'je vous remercie': 1.5,       # 419x
-            'tres bien': 1,                # 439x
-            'parfait': 1,                  # 206x
-            'super': 1,                    # 197x
-            'ca marche': 1,                # 248x
-
-            # Light positive (0.3) - polite closings, not strong sentiment
-            'bonne journee': 0.3,          # 563x (routine goodbye)
-            'bon courage': 0.3,            # 43x
-            'c\'est bon': 0.3,             # 395x (often just acknowledgement)
-            # NOTE: 'merci' alone (1670x), 'd'accord' (1375x), 'ok' (1176x),
-            # 'au revoir' (1429x) are too frequent/routine to be sentiment signals
-        }
+    # Special summary patterns and resolution modifiers (SUMMARY_RULES)
+    for rule in SUMMARY_RULE_SET.matches(text.norm_summary):
+        if rule.get('requires') == 'negative' and neg_score <= 0:
+            continue
+        if rule['score'] == 'negative':
+            neg_score += rule['weight']
+        else:
+            pos_score += rule['weight']
+
+    # --- Score from TRANSCRIPTS (raw voices, data-mined phrases), weighted per speaker ---
+    speakers = {role: [0, 0] for role in SPEAKER_ROLES}
+    trajectory = None
+    for track in text.tracks:
+        speaker_weight = SPEAKER_WEIGHTS[track.role]
+        scores = speakers[track.role]
 
-        for phrase, weight in transcript_neg.items():
-            count = norm_transcript.count(normalize_text(phrase))
-            neg_score += count * weight * 0.5  # Half weight from transcript
+        for _, weight, count in track.hits['transcript_negative']:
+            scores[0] += count * weight * speaker_weight
 
-        for phrase, weight in transcript_pos.items():
-            count = norm_transcript.count(normalize_text(phrase))
-            pos_score += count * weight * 0.5  # Half weight from transcript
+        for _, weight, count in track.hits['transcript_positive']:
+            scores[1] += count * weight * speaker_weight
 
-        # Transcript tone patterns
-        exclamation_count = transcript.count('!')
+        if track.role != 'customer':
+            continue
+
+        # Tone patterns of the customer's turns
+        exclamation_count = track.text.count('!')
         if exclamation_count >= 5:
-            neg_score += 1  # Many exclamations suggest agitation
+            scores[0] += 1  # Many exclamations suggest agitation
 
         # Long rants (very long transcript relative to summary = frustrated customer)
-        if len(transcript) > 2000 and len(transcript) > len(summary) * 5:
-            neg_score += 1
+        if len(track.text) > 2000 and len(track.text) > len(text.summary) * 5:
+            scores[0] += 1
+
+        trajectory = sentiment_trajectory(track.sections, speaker_weight)
+
+    # Only the customer's voice counts toward the overall sentiment
+    neg_score += speakers['customer'][0]
+    pos_score += speakers['customer'][1]
+
+    customer, agent = speakers['customer'], speakers['agent']
+    return neg_score, pos_score, neutral_hits, (customer[0], customer[1], agent[0], agent[1]), trajectory
+
+
+def sentiment_trajectory(sections, weight):
+    """Direction of the customer's sentiment over the call: the net
+    transcript score of their closing turns compared with their opening ones."""
+    opening, closing = sections[0], sections[-1]
+    change = (_net_transcript_score(closing) - _net_transcript_score(opening)) * weight
+    if change >= TRAJECTORY_MIN_CHANGE:
+        return 'improving'
+    if change <= -TRAJECTORY_MIN_CHANGE:
+        return 'worsening'
+    return 'stable'
 
-    # Calculate final sentiment
+
+def _net_transcript_score(hits):
+    return (sum(count * weight for _, weight, count in hits['transcript_positive'])
+            - sum(count * weight for _, weight, count in hits['transcript_negative']))
+
+
+def classify_sentiment(neg_score, pos_score, neutral_hits):
+    """Decision rules: (sentiment, confidence) from the lexicon scores.
+
+    Keep in sync with the vectorized rules in _classify_arrays().
+    """
     net_score = pos_score - neg_score
 
     if net_score >= 2:
@@ -258,277 +278,1139 @@ def analyze_sentiment(summary, transcript=''):
         sentiment = 'neutral'
         confidence = 2
 
-    return sentiment, confidence, neg_score, pos_score
+    return sentiment, confidence
+
+
+def analyze_batch(summaries, transcripts=None, budget=None):
+    """Score many conversations at once.
+
+    Returns {'neg_score', 'pos_score', 'neutral_hits', 'confidence',
+    'sentiment'} as parallel arrays; 'sentiment' holds codes into
+    SENTIMENTS. Values match analyze_sentiment() record for record.
+
+    The lexicon scan is per text; the decision rules then run as array
+    operations. With NumPy the arrays are numpy arrays, otherwise
+    array.array and the rules are applied one record at a time.
+    """
+    if transcripts is None:
+        transcripts = [''] * len(summaries)
+    neg = array('d')
+    pos = array('d')
+    neutral = array('i')
+    for summary, transcript in zip(summaries, transcripts):
+        text = SegmentedConversation(summary or '', transcript or '', budget)
+        neg_score, pos_score, neutral_hits, _, _ = sentiment_scores(text)
+        neg.append(neg_score)
+        pos.append(pos_score)
+        neutral.append(neutral_hits)
+
+    if np is None:
+        codes = array('b')
+        confidence = array('b')
+        for neg_score, pos_score, neutral_hits in zip(neg, pos, neutral):
+            sentiment, conf = classify_sentiment(neg_score, pos_score, neutral_hits)
+            codes.append(SENTIMENTS.index(sentiment))
+            confidence.append(conf)
+        return {'neg_score': neg, 'pos_score': pos, 'neutral_hits': neutral,
+                'confidence': confidence, 'sentiment': codes}
+
+    neg = np.frombuffer(neg, dtype=np.float64)
+    pos = np.frombuffer(pos, dtype=np.float64)
+    neutral = np.frombuffer(neutral, dtype=np.intc)
+    codes, confidence = _classify_arrays(neg, pos, neutral)
+    return {'neg_score': neg, 'pos_score': pos, 'neutral_hits': neutral,
+            'confidence': confidence, 'sentiment': codes}
+
+
+def _classify_arrays(neg, pos, neutral):
+    """classify_sentiment() over NumPy arrays: (sentiment codes, confidence)."""
+    net = pos - neg
+    # Rules in classify_sentiment() order; the first matching one wins
+    conditions = [
+        net >= 2,
+        net <= -2,
+        (neg > pos) & (neg >= 2),
+        (pos > neg) & (pos >= 2),
+        (neutral >= 2) | ((neg <= 1) & (pos <= 1)),
+        neg > pos,
+    ]
+    positive, neutral_code, negative = (SENTIMENTS.index(s) for s in ('positive', 'neutral', 'negative'))
+    codes = np.select(conditions, [positive, negative, negative, positive, neutral_code, negative],
+                      default=neutral_code).astype(np.int8)
+    # Scores are never negative, so truncation is int()
+    pos_int = np.trunc(pos)
+    neg_int = np.trunc(neg)
+    confidence = np.select(conditions, [
+        np.minimum(5, 2 + pos_int),
+        np.minimum(5, 2 + neg_int),
+        np.minimum(5, 1 + neg_int),
+        np.minimum(5, 1 + pos_int),
+        3,
+        2,
+    ], default=2).astype(np.int8)
+    return codes, confidence
 
 
 # ─── Theme Extraction ────────────────────────────────────────────────────────
 
-THEME_PATTERNS = {
-    'Livraison non recue': [
-        'non livre', 'pas livre', 'non recu', 'pas recu', 'pas receptionne',
-        'non receptionne', 'marque comme livre', 'indique comme livre',
-        'colis non livre', 'livraison manquee', 'n\'a pas ete livre',
-    ],
-    'Retard de livraison': [
-        'retard', 'reporte', 'reportee', 'en retard', 'devait etre livre',
-        'date de livraison', 'delai', 'attend depuis', 'en attente',
-        'pas de nouvelle', 'aucune nouvelle',
-    ],
-    'Colis endommage': [
-        'endommage', 'endommagee', 'abime', 'casse', 'defectueux',
-        'defectueuse', 'deteriore', 'deterioree', 'ouvert',
-    ],
-    'Suivi et Tracking': [
-        'suivi', 'tracking', 'numero de suivi', 'statut', 'mise a jour',
-        'pas de mise a jour', 'scan', 'information de suivi',
-    ],
-    'Comportement du livreur': [
-        'comportement', 'inapproprie', 'insulte', 'insulter',
-        'impoli', 'propos inappropries', 'attitude',
-        'n\'a pas attendu', 'n\'a pas sonne', 'pas sonne',
-        'refus de monter', 'n\'a pas voulu',
-    ],
-    'Point relais': [
-        'point relais', 'point de retrait', 'relais colis', 'bureau de poste',
-        'point relay', 'relais', 'retrait',
-    ],
-    'Reprogrammation livraison': [
-        'reprogramm', 'relivraison', 'nouvelle livraison', 'reprogrammer',
-        'nouvelle tentative', 'reporter', 'modifier la date',
-        'changement de date', 'prochaine livraison',
-    ],
-    'Reclamation': [
-        'reclamation', 'litige', 'plainte', 'certificat de non-reception',
-        'enquete', 'investigation', 'dossier',
-    ],
-    'Communication et Notifications': [
-        'notification', 'sms', 'pas de notification', 'aucune notification',
-        'pas ete informe', 'pas recu de notification',
-        'pas recu de message', 'pas de nouvelles', 'aucune nouvelle',
-        'sans nouvelle', 'pas prevenu', 'contradictoires', 'contradictoire',
-        'phishing', 'message suspect',
-    ],
-    'Adresse incorrecte': [
-        'adresse incorrecte', 'adresse erronee', 'mauvaise adresse',
-        'erreur d\'adresse', 'adresse incomplete', 'adresse inconnue',
-        'changement d\'adresse', 'modifier l\'adresse', 'code postal',
-    ],
-    'Colis perdu': [
-        'perdu', 'perte', 'egare', 'disparu', 'introuvable',
-        'retrouv', 'recherch',
-    ],
-    "Probleme d'acces": [
-        'interphone', 'code', 'acces', 'digicode', 'porte',
-        'boite aux lettres', 'etage', 'batiment', 'residence',
-        'gps', 'localisation',
-    ],
-    'DPD Pro / B2B': [
-        'societe', 'entreprise', 'professionnel',
-        'client pro', 'b2b', 'expedition', 'expedier',
-        'bordereaux', 'ramasse', 'enlevement', 'collecte',
-        'fournisseur', 'magasin', 'boutique en ligne',
-    ],
-    'Retour de colis': [
-        'retour', 'renvoi', 'renvoyer', 'retourne a l\'expediteur',
-        'retour expediteur', 'refus', 'refuse',
-    ],
-}
-
 
 def extract_themes(summary):
     """Extract up to 3 themes from a conversation summary."""
-    norm = normalize_text(summary)
+    return conversation_themes(SegmentedConversation(summary))
+
+
+def conversation_themes(text):
+    """extract_themes() of a SegmentedConversation."""
     theme_scores = {}
 
-    for theme, keywords in THEME_PATTERNS.items():
-        score = 0
-        for kw in keywords:
-            count = norm.count(normalize_text(kw))
-            score += count
-        if score > 0:
-            theme_scores[theme] = score
+    for _, theme, count in text.summary_hits['themes']:
+        theme_scores[theme] = theme_scores.get(theme, 0) + count
 
-    # Sort by score and return top 3
-    sorted_themes = sorted(theme_scores.items(), key=lambda x: x[1], reverse=True)
-    return [t[0] for t in sorted_themes[:3]] or ['Service client']
+    # Top 3 by score
+    return [t[0] for t in top_k(theme_scores.items(), 3, key=itemgetter(1))] or ['Service client']
 
 
 # ─── Keyword Extraction ──────────────────────────────────────────────────────
 
-STOP_WORDS = {
-    'le', 'la', 'les', 'un', 'une', 'des', 'de', 'du', 'au', 'aux',
-    'et', 'ou', 'mais', 'donc', 'car', 'que', 'qui', 'dont', 'en', 'a',
-    'pour', 'par', 'sur', 'avec', 'dans', 'ce', 'cette', 'ces', 'son',
-    'sa', 'ses', 'mon', 'ma', 'mes', 'il', 'elle', 'ils', 'elles', 'on',
-    'ne', 'pas', 'plus', 'est', 'sont', 'ete', 'avoir', 'etre', 'fait',
-    'se', 'si', 'je', 'nous', 'vous', 'leur', 'leurs', 'tout', 'tous',
-    'toute', 'toutes', 'apres', 'avant', 'aussi', 'bien', 'comme', 'entre',
-    'meme', 'autre', 'autres', 'chez', 'sans', 'sous', 'lors', 'non',
-    'oui', 'tres', 'elle', 'lui', 'y', 'avait', 'eu', 'puis', 'pu',
-    'etait', 'soit', 'deja', 'encore', 'quand', 'quel', 'quelle',
-    'agent', 'client', 'cliente', 'service', 'numero', 'colis', 'contact',
-    'contacte', 'dpd', 'france', 'fourni', 'informe', 'informee', 'apres',
-    'avoir', 'deux', 'trois', 'premier', 'premiere', 'cas', 'depuis',
-    'jour', 'jours', 'fait', 'ainsi', 'suite', 'tandis', 'alors',
-}
 
-# Data-driven keyword candidates (mined from 2000 real conversations)
-KEYWORD_CANDIDATES = {
-    # Core delivery terms (very high frequency in summaries)
-    'livraison': 'livraison', 'livre': 'livraison', 'livrer': 'livraison',
-    'colis': 'colis',
-    'adresse': 'adresse',
-    'suivi': 'suivi', 'tracking': 'suivi',
-
-    # Delivery actors (645x livreur, 176x chauffeur, 186x destinataire)
-    'livreur': 'livreur', 'chauffeur': 'livreur',
-    'destinataire': 'destinataire',
-    'expediteur': 'expediteur',
-
-    # Locations (975x agence, 697x relais, 373x domicile, 202x depot)
-    'agence': 'agence', 'depot': 'depot',
-    'relais': 'point relais', 'point de retrait': 'point relais',
-    'domicile': 'domicile',
-
-    # Process terms (230x tentative, 177x reprogrammer, 232x nouvelle livraison)
-    'tentative': 'tentative livraison', 'tentatives': 'tentative livraison',
-    'reprogramm': 'reprogrammation', 'relivraison': 'reprogrammation',
-
-    # Issues (223x reclamation, 206x retour, 150x retard, 128x erreur)
-    'reclamation': 'reclamation', 'litige': 'reclamation',
-    'retour': 'retour',
-    'retard': 'retard', 'retarde': 'retard',
-    'erreur': 'erreur',
-    'echec': 'echec livraison',
-    'absence': 'absence', 'absent': 'absence',
-
-    # Communication (392x mail, 296x telephone, 172x notification, 137x sms)
-    'notification': 'notification', 'sms': 'sms',
-    'mail': 'email', 'e-mail': 'email',
-    'telephone': 'telephone', 'appel': 'telephone',
-
-    # Tracking & proof (319x statut, 199x confirmation, 75x preuve)
-    'statut': 'statut',
-    'confirmation': 'confirmation', 'confirme': 'confirmation',
-    'preuve': 'preuve livraison',
-    'signature': 'signature', 'photo': 'preuve photo',
-    'scan': 'scan',
-
-    # Client emotion (206x frustration, 171x mecontentement)
-    'frustration': 'frustration', 'mecontentement': 'mecontentement',
-
-    # External partners (293x chronopost, 156x vendeur)
-    'chronopost': 'chronopost',
-    'amazon': 'amazon',
-    'vendeur': 'vendeur',
-    'commande': 'commande',
-
-    # Physical delivery details
-    'boite aux lettres': 'boite aux lettres',
-    'interphone': 'interphone', 'digicode': 'interphone',
-    'code': 'code acces',
-    'gps': 'gps',
-    'poids': 'poids', 'volumineux': 'volumineux',
-    'meuble': 'meuble', 'pneu': 'pneus',
-
-    # Schedule terms (346x lundi, 157x samedi, 138x matin, 120x midi)
-    'lundi': 'jour ouvre',
-    'samedi': 'samedi',
-    'matin': 'creneau horaire', 'midi': 'creneau horaire',
-
-    # Key transcript terms (558x souci, 788x probleme)
-    'souci': 'souci',
-    'probleme': 'probleme',
-    'attends': 'attente',
-    'galere': 'galere',
-}
+def extract_keywords(summary, transcript='', budget=None):
+    """Extract 2-4 relevant keywords from summary + transcript (one or a tuple by speaker)."""
+    return conversation_keywords(SegmentedConversation(summary, transcript, budget))
 
 
-def extract_keywords(summary, transcript=''):
-    """Extract 2-4 relevant keywords from summary + transcript."""
-    norm_s = normalize_text(summary)
-    norm_t = normalize_text(transcript)
+def conversation_keywords(text):
+    """extract_keywords() of a SegmentedConversation."""
+    counts = {}
+    for idx, keyword, count in text.summary_hits['keywords']:
+        counts[idx] = [keyword, count, 0]
+    for track in text.tracks:
+        if track.role != 'customer':
+            continue
+        for idx, keyword, count in track.hits['keywords']:
+            counts.setdefault(idx, [keyword, 0, 0])[2] += count
     found = {}
 
-    for trigger, keyword in KEYWORD_CANDIDATES.items():
-        norm_trigger = normalize_text(trigger)
-        # Summary matches count fully, transcript matches count half
-        s_count = norm_s.count(norm_trigger)
-        t_count = norm_t.count(norm_trigger)
+    # Triggers are visited in table order so ties keep their original ranking
+    for idx in sorted(counts):
+        keyword, s_count, t_count = counts[idx]
+        # Summary matches count fully, customer transcript matches count half
         total = s_count + t_count * 0.5
-        if total > 0:
-            found[keyword] = found.get(keyword, 0) + total
+        found[keyword] = found.get(keyword, 0) + total
+
+    # Top 4 by frequency
+    return [k[0] for k in top_k(found.items(), 4, key=itemgetter(1))] or ['colis', 'livraison']
+
+
+def top_k(items, k, key):
+    """The k largest items by key, largest first.
+
+    Same result as sorted(items, key=key, reverse=True)[:k], ties included
+    (they keep their input order), but with a bounded heap instead of a
+    full sort.
+    """
+    return heapq.nlargest(k, items, key=key)
+
 
-    # Sort by frequency and return top 4
-    sorted_kw = sorted(found.items(), key=lambda x: x[1], reverse=True)
-    return [k[0] for k in sorted_kw[:4]] or ['colis', 'livraison']
+# ─── Phrase Matcher ──────────────────────────────────────────────────────────
+
+class PhraseMatcher:
+    """Count phrases from several lexicon tables in a single scan of a text.
+
+    All normalized phrases are compiled into one regex shaped like a prefix
+    trie. The regex is evaluated as a lookahead at every position and yields
+    the longest phrase starting there; every shorter phrase that is a prefix
+    of it matches at the same position too. Per-phrase counts follow
+    ``str.count`` semantics (non-overlapping, leftmost first), so results are
+    the same as counting each phrase separately.
+    """
+
+    def __init__(self, tables):
+        """tables: {name: [(phrase, value), ...]} in scoring order."""
+        self.tables = tables
+        self._targets = defaultdict(list)  # normalized phrase -> [(table, index, value)]
+        for name, entries in tables.items():
+            for idx, (phrase, value) in enumerate(entries):
+                self._targets[normalize_text(phrase)].append((name, idx, value))
+
+        phrases = sorted(self._targets)
+        # Phrases implied by a match of each phrase (itself and its prefixes)
+        self._implied = {
+            phrase: [p for p in phrases if phrase.startswith(p)]
+            for phrase in phrases
+        }
+        self._pattern = re.compile('(?=({}))'.format(self._trie_regex(phrases)))
+        self._table_targets = {}  # tables -> _targets restricted to them (see scan_sections)
+
+    def __getstate__(self):
+        return {'tables': self.tables, 'targets': dict(self._targets),
+                'implied': self._implied, 'pattern': self._pattern.pattern}
+
+    def __setstate__(self, state):
+        self.tables = state['tables']
+        self._targets = defaultdict(list, state['targets'])
+        self._implied = state['implied']
+        self._pattern = re.compile(state['pattern'])
+        self._table_targets = {}
+
+    @staticmethod
+    def _trie_regex(phrases):
+        trie = {}
+        for phrase in phrases:
+            node = trie
+            for ch in phrase:
+                node = node.setdefault(ch, {})
+            node[''] = None
+
+        def build(node):
+            branches = [re.escape(ch) + build(child)
+                        for ch, child in sorted(node.items()) if ch]
+            if not branches:
+                return ''
+            body = branches[0] if len(branches) == 1 else '(?:{})'.format('|'.join(branches))
+            # Greedy optional group: prefer the longest phrase at this position
+            return '(?:{})?'.format(body) if '' in node else body
+
+        return build(trie)
+
+    def scan(self, norm_text):
+        """Return {table: [(index, value, count), ...]} for phrases found in norm_text.
+
+        Entries are in table order and only phrases with a non-zero count are listed.
+        """
+        counts = Counter()
+        next_start = {}
+        for m in self._pattern.finditer(norm_text):
+            start = m.start()
+            for phrase in self._implied[m.group(1)]:
+                if start >= next_start.get(phrase, 0):
+                    counts[phrase] += 1
+                    next_start[phrase] = start + len(phrase)
+        return self._hits(counts)
+
+    def scan_sections(self, norm_text, cuts, tables):
+        """scan() of norm_text plus the hits of ``tables`` in each section of
+        it cut at the sorted offsets ``cuts``: (hits, [section hits, ...]).
+
+        A match counts in the section it starts in, with the counting of the
+        whole-text scan, so the section counts add up to the total ones.
+        """
+        counts = Counter()
+        totals = []  # counts at each cut
+        next_start = {}
+        next_cut = cuts[0] if cuts else len(norm_text)
+        for m in self._pattern.finditer(norm_text):
+            start = m.start()
+            while start >= next_cut:
+                totals.append(counts.copy())
+                next_cut = cuts[len(totals)] if len(totals) < len(cuts) else len(norm_text)
+            for phrase in self._implied[m.group(1)]:
+                if start >= next_start.get(phrase, 0):
+                    counts[phrase] += 1
+                    next_start[phrase] = start + len(phrase)
+        totals.extend([counts] * (len(cuts) + 1 - len(totals)))
+
+        targets = self._targets_of(tables)
+        found = counts.keys() & targets.keys()
+        sections = []
+        previous = {}
+        for total in totals:
+            hits = {name: [] for name in tables}
+            for phrase in found:
+                count = total.get(phrase, 0) - previous.get(phrase, 0)
+                if count:
+                    for name, idx, value in targets[phrase]:
+                        hits[name].append((idx, value, count))
+            for entries in hits.values():
+                entries.sort()
+            sections.append(hits)
+            previous = total
+        return self._hits(counts), sections
+
+    def _targets_of(self, tables):
+        """The phrase targets restricted to ``tables`` (cached)."""
+        targets = self._table_targets.get(tables)
+        if targets is None:
+            targets = self._table_targets[tables] = {}
+            for phrase, entries in self._targets.items():
+                entries = [entry for entry in entries if entry[0] in tables]
+                if entries:
+                    targets[phrase] = entries
+        return targets
+
+    def _hits(self, counts):
+        hits = {name: [] for name in self.tables}
+        for phrase, count in counts.items():
+            for name, idx, value in self._targets[phrase]:
+                hits[name].append((idx, value, count))
+        for entries in hits.values():
+            entries.sort()
+        return hits
+
+
+MATCHER_FORMAT = 1  # bump when PhraseMatcher's attributes change
+
+
+def phrase_matcher_path():
+    """Compiled matcher artifact for the current lexicon, code and Python version."""
+    key = hashlib.sha256(json.dumps(
+        [MATCHER_FORMAT, LEXICON_HASH, ACCENT_FOLDS, sys.version_info[:2]]).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(COMPILED_LEXICON_DIR, 'phrase-matcher-{}.pickle'.format(key))
+
+
+def load_phrase_matcher(rebuild=False):
+    """The PhraseMatcher of the lexicon tables, unpickled from its compiled
+    artifact when one exists (building the trie and the phrase prefix map is
+    most of the import time), otherwise built and saved for the next run.
+
+    An artifact that cannot be loaded, or that was not built from the
+    current tables, is rebuilt and rewritten.
+    """
+    tables = {
+        'negative': list(NEGATIVE_INDICATORS.items()),
+        'positive': list(POSITIVE_INDICATORS.items()),
+        'neutral': [(phrase, None) for phrase in NEUTRAL_INDICATORS],
+        'transcript_negative': list(TRANSCRIPT_NEGATIVE_INDICATORS.items()),
+        'transcript_positive': list(TRANSCRIPT_POSITIVE_INDICATORS.items()),
+        'themes': [(kw, theme) for theme, keywords in THEME_PATTERNS.items() for kw in keywords],
+        'keywords': list(KEYWORD_CANDIDATES.items()),
+    }
+    path = phrase_matcher_path()
+    if not rebuild:
+        try:
+            with open(path, 'rb') as f:
+                matcher = PhraseMatcher.__new__(PhraseMatcher)
+                matcher.__setstate__(pickle.load(f))
+            if matcher.tables == tables:
+                return matcher
+        except Exception:  # truncated, stale or foreign artifact: a cache miss
+            pass
+
+    matcher = PhraseMatcher(tables)
+    try:
+        os.makedirs(COMPILED_LEXICON_DIR, exist_ok=True)
+        tmp = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp, 'wb') as f:
+            # Plain state, not the instance: the script also runs as __main__
+            pickle.dump(matcher.__getstate__(), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        for name in os.listdir(COMPILED_LEXICON_DIR):
+            if name.startswith('phrase-matcher-') and os.path.join(COMPILED_LEXICON_DIR, name) != path:
+                os.remove(os.path.join(COMPILED_LEXICON_DIR, name))
+    except OSError:
+        pass  # read-only install: the matcher is built in memory on every start
+    return matcher
+
+
+PHRASE_MATCHER = load_phrase_matcher()
+
+
+REGEX_METACHARACTERS = '.^$*+?{}[]\\|()'
+
+
+class RuleSet:
+    """A table of regex rules, compiled once and evaluated together.
+
+    Patterns without regex syntax are tested with a plain substring check.
+    A single alternation of named groups was measured at 2.5-3.5x slower
+    than one precompiled search per rule: CPython's re has no multi-pattern
+    automaton, and an alternation loses the literal-prefix scan each
+    pattern gets on its own.
+    """
+
+    def __init__(self, rules):
+        self.rules = tuple(rules)
+        self._tests = []
+        for rule in self.rules:
+            pattern = rule['pattern']
+            if not any(c in pattern for c in REGEX_METACHARACTERS):
+                self._tests.append(lambda text, literal=pattern: literal in text)
+            else:
+                self._tests.append(re.compile(pattern).search)
+
+    def matches(self, text):
+        """Rules with at least one match in text, in table order."""
+        return [rule for rule, test in zip(self.rules, self._tests) if test(text)]
+
+
+SUMMARY_RULE_SET = RuleSet(SUMMARY_RULES)
+
+
+# ─── Speaker Turns ───────────────────────────────────────────────────────────
+
+TRANSCRIPT_FIELD_RE = re.compile(r'transcript_speaker_([1-9][0-9]*)$')
+SPEAKER_ROLES = ('customer', 'agent')               # speaker 1 is the customer, later speakers agents
+SPEAKER_WEIGHTS = {'customer': 0.5, 'agent': 0.25}  # weight of transcript phrases per speaker role
+TURN_END_RE = re.compile(r'[.!?…]+\s|\n')           # transcripts have no turn markers: sentences are turns
+TURN_SEARCH_CHARS = 200       # a section cut waits this long at most for the turn in progress to end
+TRAJECTORY_SECTIONS = 3       # the customer's turns are scored as opening, middle and closing thirds
+TRAJECTORY_MIN_CHANGE = 1     # weighted net score change (closing - opening) of an improving/worsening call
+TRAJECTORIES = ('improving', 'stable', 'worsening')
+
+
+def speaker_transcripts(conv):
+    """Transcripts of a conversation record by speaker, from its
+    transcript_speaker_N fields: (speaker 1, speaker 2, ...).
+
+    A missing speaker gets ''; the tuple always has the first speaker.
+    """
+    tracks = {}
+    for field, value in conv.items():
+        m = TRANSCRIPT_FIELD_RE.match(field)
+        if m and value and isinstance(value, str):
+            tracks[int(m.group(1))] = value
+    if not tracks:
+        return ('',)
+    return tuple(tracks.get(n, '') for n in range(1, max(tracks) + 1))
+
+
+def speaker_role(speaker):
+    """Role of the speaker at a (0-based) position of speaker_transcripts()."""
+    return SPEAKER_ROLES[min(speaker, len(SPEAKER_ROLES) - 1)]
+
+
+def turn_cuts(norm_text, sections=TRAJECTORY_SECTIONS):
+    """Offsets cutting a transcript into ``sections`` runs of whole turns of
+    about equal length. A cut with no turn end within TURN_SEARCH_CHARS falls
+    on the next word boundary instead."""
+    cuts = []
+    for k in range(1, sections):
+        target = max(len(norm_text) * k // sections, cuts[-1] if cuts else 0)
+        m = TURN_END_RE.search(norm_text, target, target + TURN_SEARCH_CHARS)
+        if m:
+            cut = m.end()
+        else:
+            cut = norm_text.find(' ', target)
+            if cut < 0:
+                cut = len(norm_text)
+        cuts.append(cut)
+    return cuts
+
+
+class SpeakerTrack:
+    """One speaker's transcript, normalized and scanned for phrases once.
+
+    For the customer, ``sections`` also holds the phrase hits of their
+    opening, middle and closing turns (see turn_cuts); None for agents.
+    """
+
+    __slots__ = ('role', 'text', 'hits', 'sections')
+
+    def __init__(self, role, text, budget=None):
+        self.role = role
+        self.text = text
+        norm_text = normalize_text(budget.window(text) if budget else text)
+        if role == 'customer':
+            self.hits, self.sections = PHRASE_MATCHER.scan_sections(
+                norm_text, turn_cuts(norm_text), ('transcript_negative', 'transcript_positive'))
+        else:
+            self.hits, self.sections = PHRASE_MATCHER.scan(norm_text), None
+
+
+class SegmentedConversation:
+    """The texts of a conversation, normalized, cut into turns and scanned
+    for phrases once; sentiment, theme and keyword extraction all read them
+    from here.
+
+    transcripts is the customer's transcript or a tuple of transcripts by
+    speaker (see speaker_transcripts); empty ones get no track.
+    """
+
+    __slots__ = ('summary', 'norm_summary', 'summary_hits', 'tracks')
+
+    def __init__(self, summary, transcripts=(), budget=None):
+        if isinstance(transcripts, str):
+            transcripts = (transcripts,)
+        self.summary = summary
+        self.norm_summary = normalize_text(summary)
+        self.summary_hits = PHRASE_MATCHER.scan(self.norm_summary)
+        self.tracks = [SpeakerTrack(speaker_role(speaker), transcript, budget)
+                       for speaker, transcript in enumerate(transcripts) if transcript]
+
+
+# ─── Conversation Records ────────────────────────────────────────────────────
+
+PAGE_SUMMARY_CHARS = 500  # summary characters used by the page files (fullText)
+
+
+class ConversationResult:
+    """Scores of one conversation. Themes and keywords are tuples of interned
+    strings, so the few distinct values are shared by all results; the JSON
+    shape (to_dict) is only built at the output edge.
+
+    speakers is (customer_neg, customer_pos, agent_neg, agent_pos) and
+    trajectory one of TRAJECTORIES (see sentiment_scores); both are None for
+    results read back from a result store.
+    """
+
+    __slots__ = ('sentiment', 'confidence', 'themes', 'keywords', 'speakers', 'trajectory')
+
+    def __init__(self, sentiment, confidence, themes, keywords, speakers=None, trajectory=None):
+        self.sentiment = sys.intern(sentiment)
+        self.confidence = confidence
+        self.themes = tuple(map(sys.intern, themes))
+        self.keywords = tuple(map(sys.intern, keywords))
+        self.speakers = tuple(speakers) if speakers is not None else None
+        self.trajectory = sys.intern(trajectory) if trajectory else None
+
+    def __reduce__(self):
+        # Re-intern on unpickling (results come back from scoring processes)
+        return ConversationResult, (self.sentiment, self.confidence, self.themes, self.keywords,
+                                    self.speakers, self.trajectory)
+
+    def to_dict(self):
+        data = {
+            'sentiment': self.sentiment,
+            'confidence': self.confidence,
+            'themes': list(self.themes),
+            'keywords': list(self.keywords),
+        }
+        if self.speakers is not None:
+            customer_neg, customer_pos, agent_neg, agent_pos = self.speakers
+            data['speakers'] = {
+                'customer': {'neg_score': customer_neg, 'pos_score': customer_pos},
+                'agent': {'neg_score': agent_neg, 'pos_score': agent_pos},
+            }
+            data['trajectory'] = self.trajectory
+        return data
+
+
+class ConversationRecord:
+    """The fields of a conversation record kept once it is scored."""
+
+    __slots__ = ('summary', 'audio_duration', 'date')
+
+    def __init__(self, summary, audio_duration=0, date=None):
+        self.summary = summary or ''
+        self.audio_duration = audio_duration or 0
+        self.date = sys.intern(date) if date else None
+
+    @classmethod
+    def from_conversation(cls, conv):
+        """Record of a conversation dict. A numeric string audio_duration is
+        converted; a non-string summary or a duration that is not a finite
+        number raises ValueError."""
+        summary = conv.get('summary', '') or ''
+        if not isinstance(summary, str):
+            raise ValueError('summary must be a string')
+        duration = conv.get('audio_duration', 0) or 0
+        if isinstance(duration, str):
+            try:
+                duration = float(duration)
+            except ValueError:
+                raise ValueError('audio_duration must be a number: {!r}'.format(duration)) from None
+        if isinstance(duration, bool) or not isinstance(duration, (int, float)) or not math.isfinite(duration):
+            raise ValueError('audio_duration must be a number: {!r}'.format(duration))
+        return cls(summary, duration, conversation_date(conv))
 
 
 # ─── Dashboard Data Generation ──────────────────────────────────────────────
 
-def generate_dashboard_files(conversations, results):
-    """Generate all 9 _dpd.json dashboard files."""
-    print("\n--- Generating Dashboard Data Files ---")
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+SITE_NAMES = ['Paris', 'Lyon', 'Marseille', 'Toulouse', 'Bordeaux',
+              'Nantes', 'Strasbourg', 'Lille', 'Nice', 'Montpellier',
+              'Rennes', 'Grenoble']
+
+SENTIMENTS = ('positive', 'neutral', 'negative')
+
+
+def _month_key(i, total):
+    """Timeline month for the i-th conversation: spread over 12 months (Mar 2025 - Feb 2026)."""
+    bucket = min(int(i * 12 / total), 11)
+    month_num = 3 + bucket  # Start from March
+    year = 2025 if month_num <= 12 else 2026
+    if month_num > 12:
+        month_num -= 12
+    return '{}-{:02d}'.format(year, month_num)
+
+
+# Record fields probed, in order, for the conversation creation time
+TIMESTAMP_FIELDS = ('created_at', 'createdAt', 'start_time', 'timestamp', 'date')
+ROLLING_WINDOWS = (7, 30)   # days
+TREND_WINDOW = 30           # KPI trends compare the last N days with the N days before
+
+
+def parse_timestamp(value):
+    """UTC calendar date ('YYYY-MM-DD') of a timestamp, or None if it can't be read.
+
+    Accepts ISO 8601 strings, epoch seconds or milliseconds, and MongoDB
+    extended JSON ({"$date": ...}).
+    """
+    if isinstance(value, dict):
+        value = value.get('$date', value.get('$numberLong'))
+        if isinstance(value, dict):
+            value = value.get('$numberLong')
+        if isinstance(value, str) and value.isdigit():
+            value = int(value)
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            seconds = value / 1000 if value > 1e11 else value
+            moment = datetime.fromtimestamp(seconds, timezone.utc)
+        else:
+            moment = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+            if moment.tzinfo is not None:
+                moment = moment.astimezone(timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+    return moment.date().isoformat()
+
+
+def conversation_date(conv):
+    """Creation date of a conversation record (see TIMESTAMP_FIELDS), or None."""
+    for field in TIMESTAMP_FIELDS:
+        if conv.get(field) is not None:
+            day = parse_timestamp(conv[field])
+            if day:
+                return day
+    return None
+
+
+def _satisfaction(counts):
+    """(positive + 0.5*neutral) / total * 100 for [positive, neutral, negative] counts."""
+    volume = sum(counts)
+    return round((counts[0] + counts[1] * 0.5) / volume * 100, 1) if volume else 0
+
+
+class TimeCubes:
+    """Sentiment counts per day, ISO week and month, updated as conversations arrive.
+
+    Each cube maps a bucket key ('2025-03-14', '2025-W11', '2025-03') to
+    [positive, neutral, negative] counts, so timelines and rolling windows
+    are read from the cubes without revisiting or sorting conversations.
+    """
+
+    GRANULARITIES = ('day', 'week', 'month')
+
+    def __init__(self):
+        self.cubes = {g: {} for g in self.GRANULARITIES}
+        self.last_day = None
+
+    @staticmethod
+    def bucket_keys(day):
+        d = date.fromisoformat(day)
+        year, week, _ = d.isocalendar()
+        return {'day': day, 'week': '{:04d}-W{:02d}'.format(year, week), 'month': day[:7]}
+
+    def add(self, day, code, count=1):
+        for granularity, key in self.bucket_keys(day).items():
+            cube = self.cubes[granularity]
+            counts = cube.get(key)
+            if counts is None:
+                counts = cube[key] = [0, 0, 0]
+            counts[code] += count
+        if self.last_day is None or day > self.last_day:
+            self.last_day = day
+
+    def merge(self, other):
+        for granularity, cube in other.cubes.items():
+            mine = self.cubes[granularity]
+            for key, counts in cube.items():
+                mine_counts = mine.setdefault(key, [0, 0, 0])
+                for code, n in enumerate(counts):
+                    mine_counts[code] += n
+        if other.last_day and (self.last_day is None or other.last_day > self.last_day):
+            self.last_day = other.last_day
+        return self
+
+    def to_dict(self):
+        return {'cubes': self.cubes, 'last_day': self.last_day}
+
+    @classmethod
+    def from_dict(cls, data):
+        cubes = cls()
+        cubes.cubes = {g: {k: list(v) for k, v in data['cubes'][g].items()} for g in cls.GRANULARITIES}
+        cubes.last_day = data['last_day']
+        return cubes
+
+    def series(self, granularity):
+        """[(key, counts)] in time order."""
+        return sorted(self.cubes[granularity].items())
+
+    def window(self, days, end=None):
+        """Counts over the `days` days ending on `end` (default: the latest day seen)."""
+        end = end or self.last_day
+        totals = [0, 0, 0]
+        if end is None:
+            return totals
+        end_date = date.fromisoformat(end)
+        daily = self.cubes['day']
+        for offset in range(days):
+            counts = daily.get((end_date - timedelta(days=offset)).isoformat())
+            if counts:
+                for code, n in enumerate(counts):
+                    totals[code] += n
+        return totals
+
+    def rolling(self, days):
+        """Volume and satisfaction of the last `days` days and of the `days` before them."""
+        if self.last_day is None:
+            return None
+        previous_end = (date.fromisoformat(self.last_day) - timedelta(days=days)).isoformat()
+        current = self.window(days)
+        previous = self.window(days, previous_end)
+        return {
+            'days': days,
+            'end': self.last_day,
+            'volume': sum(current),
+            'satisfaction': _satisfaction(current),
+            'previous_volume': sum(previous),
+            'previous_satisfaction': _satisfaction(previous),
+        }
+
+
+def _trend(change):
+    """(trend, trend_direction) for a KPI change; trend is rounded to one decimal."""
+    trend = round(change, 1)
+    return trend, 'up' if trend > 0 else ('down' if trend < 0 else 'stable')
+
+
+KEYWORD_TRACKING_CAPACITY = 1000  # keywords tracked by the word-cloud aggregates
+
+
+class HeavyHitters:
+    """Space-Saving counters: {'count', 'positive', 'neutral', 'negative'}
+    for at most ``capacity`` keys.
+
+    Counts are exact while fewer than ``capacity`` distinct keys have been
+    seen, which always holds for the keyword lexicon. Past that, a new key
+    replaces the key with the smallest count and inherits that count as
+    its overestimate (kept in ``errors``); every key seen more than
+    total / capacity times is guaranteed to be tracked.
+    """
+
+    def __init__(self, capacity=KEYWORD_TRACKING_CAPACITY):
+        self.capacity = capacity
+        self.counters = {}
+        self.errors = {}
+
+    def add(self, key, sentiment, count=1):
+        counts = self.counters.get(key)
+        if counts is None:
+            error = 0
+            if len(self.counters) >= self.capacity:
+                evicted = min(self.counters, key=lambda k: self.counters[k]['count'])
+                error = self.counters.pop(evicted)['count']
+                self.errors.pop(evicted, None)
+                self.errors[key] = error
+            counts = self.counters[key] = {'count': error, 'positive': 0, 'neutral': 0, 'negative': 0}
+        counts['count'] += count
+        counts[sentiment] += count
+
+    def items(self):
+        return self.counters.items()
+
+    def merge(self, other):
+        for key, counts in other.counters.items():
+            mine = self.counters.setdefault(key, dict.fromkeys(counts, 0))
+            for field, n in counts.items():
+                mine[field] += n
+            if key in other.errors:
+                self.errors[key] = self.errors.get(key, 0) + other.errors[key]
+        if len(self.counters) > self.capacity:
+            keep = {key for key, _ in top_k(self.counters.items(), self.capacity,
+                                            key=lambda x: x[1]['count'])}
+            self.counters = {k: v for k, v in self.counters.items() if k in keep}
+            self.errors = {k: e for k, e in self.errors.items() if k in keep}
+        return self
+
+    def to_dict(self):
+        return {'capacity': self.capacity, 'counters': self.counters, 'errors': self.errors}
+
+    @classmethod
+    def from_dict(cls, data):
+        hitters = cls(data['capacity'])
+        hitters.counters = {k: dict(v) for k, v in data['counters'].items()}
+        hitters.errors = dict(data['errors'])
+        return hitters
+
+
+def site_for(i):
+    """Site of the i-th conversation (assigned round-robin)."""
+    return SITE_NAMES[i % len(SITE_NAMES)]
+
+
+def agent_for(i):
+    """Agent id of the i-th conversation (synthetic, derived from the position)."""
+    return 'AGT-{:03d}'.format((i * 7 + 13) % 50 + 1)
+
+
+class DashboardAggregates:
+    """Mergeable aggregate state behind the dashboard files.
+
+    Conversations are folded in with add(); partial aggregates from separate
+    shards or days are combined with merge() (the other state is taken to
+    follow this one in input order). to_dict()/from_dict() give a JSON-safe
+    form so partial states can be persisted. Memory is O(themes + keywords),
+    plus one byte per conversation for the positional timeline.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.sentiment_counts = {s: 0 for s in SENTIMENTS}
+        self.theme_sentiment = {}   # theme -> {'positive', 'neutral', 'negative', 'total'}
+        self.keyword_data = HeavyHitters()  # keyword -> {'count', 'positive', 'neutral', 'negative'}
+        # Site assignment rotates with the conversation index: slot = i % len(SITE_NAMES)
+        self.site_data = [{'total': 0, 'positive': 0, 'neutral': 0, 'negative': 0}
+                          for _ in SITE_NAMES]
+        # Call duration split: short (<3min) vs long (>=3min)
+        self.channel_data = {c: {s: 0 for s in SENTIMENTS} for c in ('short', 'long')}
+        # Sentiment code per conversation, in input order
+        self.sentiment_codes = bytearray()
+        # Day/week/month cubes of the conversations with a creation date;
+        # undated ones get a positional month in the timeline only when no
+        # conversation has a date, otherwise they are only counted
+        self.time = TimeCubes()
+        self.undated_positions = array('I')
+
+    def add(self, result, audio_duration=0, day=None):
+        """Fold one ConversationResult (created on `day`, if known) into the aggregates."""
+        sentiment = result.sentiment
+        i = self.total
+        self.total += 1
+        self.sentiment_counts[sentiment] += 1
+
+        for theme in result.themes:
+            t = self.theme_sentiment.setdefault(
+                theme, {'positive': 0, 'neutral': 0, 'negative': 0, 'total': 0})
+            t[sentiment] += 1
+            t['total'] += 1
+
+        for kw in result.keywords:
+            self.keyword_data.add(kw, sentiment)
+
+        site = self.site_data[i % len(SITE_NAMES)]
+        site['total'] += 1
+        site[sentiment] += 1
+
+        channel = 'short' if (audio_duration or 0) < 180 else 'long'
+        self.channel_data[channel][sentiment] += 1
+
+        code = SENTIMENTS.index(sentiment)
+        self.sentiment_codes.append(code)
+        if day:
+            self.time.add(day, code)
+        else:
+            self.undated_positions.append(i)
+
+    def merge(self, other):
+        """Append another aggregate state, as if its conversations followed ours."""
+        offset = self.total
+        self.total += other.total
+        for s in SENTIMENTS:
+            self.sentiment_counts[s] += other.sentiment_counts[s]
+        for key, counts in other.theme_sentiment.items():
+            mine = self.theme_sentiment.setdefault(key, dict.fromkeys(counts, 0))
+            for field, n in counts.items():
+                mine[field] += n
+        self.keyword_data.merge(other.keyword_data)
+        # The other state's site slots were assigned from index 0; shift them
+        for slot, counts in enumerate(other.site_data):
+            mine = self.site_data[(slot + offset) % len(SITE_NAMES)]
+            for field, n in counts.items():
+                mine[field] += n
+        for channel, counts in other.channel_data.items():
+            for s, n in counts.items():
+                self.channel_data[channel][s] += n
+        self.sentiment_codes += other.sentiment_codes
+        self.time.merge(other.time)
+        self.undated_positions.extend(i + offset for i in other.undated_positions)
+        return self
+
+    def to_dict(self):
+        return {
+            'total': self.total,
+            'sentiment_counts': self.sentiment_counts,
+            'theme_sentiment': self.theme_sentiment,
+            'keyword_data': self.keyword_data.to_dict(),
+            'site_data': self.site_data,
+            'channel_data': self.channel_data,
+            'sentiment_codes': ''.join(str(c) for c in self.sentiment_codes),
+            'time': self.time.to_dict(),
+            'undated_positions': self.undated_positions.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        agg = cls()
+        agg.total = data['total']
+        agg.sentiment_counts = dict(data['sentiment_counts'])
+        agg.theme_sentiment = {k: dict(v) for k, v in data['theme_sentiment'].items()}
+        agg.keyword_data = HeavyHitters.from_dict(data['keyword_data'])
+        agg.site_data = [dict(d) for d in data['site_data']]
+        agg.channel_data = {k: dict(v) for k, v in data['channel_data'].items()}
+        agg.sentiment_codes = bytearray(int(c) for c in data['sentiment_codes'])
+        agg.time = TimeCubes.from_dict(data['time'])
+        agg.undated_positions = array('I', data['undated_positions'])
+        return agg
+
+    def top_negative_theme(self):
+        """Theme with the most negative mentions (first seen wins ties), and that count."""
+        top_neg_theme = None
+        top_neg_count = 0
+        for theme, sent in self.theme_sentiment.items():
+            if sent['negative'] > top_neg_count:
+                top_neg_count = sent['negative']
+                top_neg_theme = theme
+        return top_neg_theme, top_neg_count
+
+    def satisfaction_score(self):
+        pos = self.sentiment_counts['positive']
+        neu = self.sentiment_counts['neutral']
+        return round((pos + neu * 0.5) / self.total * 100) if self.total else 0
+
+    def to_dashboard_files(self):
+        """Build the aggregate dashboard files: {filename: data}.
+
+        conversations_dpd.json is per-conversation and comes from
+        iter_conversation_entries() instead.
+        """
+        total = self.total
+        theme_sentiment = self.theme_sentiment
+        pos = self.sentiment_counts['positive']
+        neu = self.sentiment_counts['neutral']
+        neg = self.sentiment_counts['negative']
+        files = {}
+
+        # ─── 1. stats_dpd.json ─────────────────────────────────────────────
+        files['stats_dpd.json'] = {
+            'total': total,
+            'positive': pos,
+            'neutral': neu,
+            'negative': neg,
+            'positive_percentage': round(pos / total * 100, 1) if total else 0,
+            'neutral_percentage': round(neu / total * 100, 1) if total else 0,
+            'negative_percentage': round(neg / total * 100, 1) if total else 0,
+        }
+
+        # Themes by mention count, ranked once for the themes list and the matrix
+        ranked_themes = sorted(theme_sentiment.items(), key=lambda x: x[1]['total'], reverse=True)
+
+        # ─── 3. themes_dpd.json ────────────────────────────────────────────
+        themes_list = []
+        for theme, sent in ranked_themes:
+            t = sent['total']
+            if t < 2:
+                continue
+            themes_list.append({
+                'theme': theme,
+                'count': t,
+                'sentiment': {
+                    'positive': sent['positive'],
+                    'neutral': sent['neutral'],
+                    'negative': sent['negative']
+                },
+                'percentage': {
+                    'positive': round(sent['positive'] / t * 100) if t else 0,
+                    'neutral': round(sent['neutral'] / t * 100) if t else 0,
+                    'negative': round(sent['negative'] / t * 100) if t else 0,
+                }
+            })
+        files['themes_dpd.json'] = themes_list
+
+        # ─── 4. word-cloud_dpd.json ────────────────────────────────────────
+        wc_list = []
+        frequent = (item for item in self.keyword_data.items() if item[1]['count'] >= 2)
+        for term, data in top_k(frequent, 50, key=lambda x: x[1]['count']):
+            wc_list.append({
+                'value': term,
+                'count': data['count'],
+                'sentiment': {
+                    'positive': data['positive'],
+                    'neutral': data['neutral'],
+                    'negative': data['negative']
+                }
+            })
+        files['word-cloud_dpd.json'] = wc_list
+
+        # ─── 5. timeline_dpd.json ──────────────────────────────────────────
+        monthly_data = defaultdict(lambda: [0, 0, 0])
+        for month_key, counts in self.time.cubes['month'].items():
+            monthly_data[month_key] = list(counts)
+        if not self.time.last_day:
+            # No creation dates at all: spread the conversations by position
+            for i in self.undated_positions:
+                monthly_data[_month_key(i, total)][self.sentiment_codes[i]] += 1
+
+        timeline = []
+        for month_key in sorted(monthly_data.keys()):
+            counts = monthly_data[month_key]
+            vol = sum(counts)
+            if vol == 0:
+                continue
+            timeline.append({'month': month_key, 'volume': vol, 'satisfaction': _satisfaction(counts)})
+        files['timeline_dpd.json'] = timeline
+
+        # ─── 5b. time-windows_dpd.json ─────────────────────────────────────
+        # Dated conversations only: rolling windows end on the latest creation date
+        windows = [self.time.rolling(days) for days in ROLLING_WINDOWS] if self.time.last_day else []
+        files['time-windows_dpd.json'] = {
+            'as_of': self.time.last_day,
+            'undated': len(self.undated_positions),
+            'windows': windows,
+            'daily': [{'date': key, 'volume': sum(counts), 'satisfaction': _satisfaction(counts)}
+                      for key, counts in self.time.series('day')],
+            'weekly': [{'week': key, 'volume': sum(counts), 'satisfaction': _satisfaction(counts)}
+                       for key, counts in self.time.series('week')],
+        }
+
+        # ─── 6. kpis_dpd.json ─────────────────────────────────────────────
+        top_neg_theme, top_neg_count = self.top_negative_theme()
+        sat_score = self.satisfaction_score()
+
+        volume_kpi = {'trend': 0, 'trend_direction': 'stable',
+                      'comparison': 'Analyse de {} conversations DPD'.format(total)}
+        satisfaction_kpi = {'trend': 0, 'trend_direction': 'stable',
+                            'comparison': 'Donnees reelles production'}
+        trend_window = self.time.rolling(TREND_WINDOW)
+        if trend_window and trend_window['previous_volume']:
+            comparison = 'vs les {} jours precedents'.format(TREND_WINDOW)
+            previous_volume = trend_window['previous_volume']
+            volume_change = (trend_window['volume'] - previous_volume) / previous_volume * 100
+            volume_kpi['trend'], volume_kpi['trend_direction'] = _trend(volume_change)
+            satisfaction_kpi['trend'], satisfaction_kpi['trend_direction'] = _trend(
+                trend_window['satisfaction'] - trend_window['previous_satisfaction'])
+            volume_kpi['comparison'] = satisfaction_kpi['comparison'] = comparison
+
+        files['kpis_dpd.json'] = {
+            'verbatims_traites': {
+                'value': total,
+                'trend': volume_kpi['trend'], 'trend_direction': volume_kpi['trend_direction'],
+                'label': 'VERBATIMS TRAITES', 'comparison': volume_kpi['comparison']
+            },
+            'score_satisfaction': {
+                'value': sat_score, 'unit': '%',
+                'trend': satisfaction_kpi['trend'], 'trend_direction': satisfaction_kpi['trend_direction'],
+                'label': 'SCORE SATISFACTION', 'comparison': satisfaction_kpi['comparison']
+            },
+            'promoteurs': {
+                'value': pos,
+                'percentage': round(pos / total * 100) if total else 0,
+                'label': 'PROMOTEURS'
+            },
+            'passifs': {
+                'value': neu,
+                'percentage': round(neu / total * 100) if total else 0,
+                'label': 'PASSIFS'
+            },
+            'detracteurs': {
+                'value': neg,
+                'percentage': round(neg / total * 100) if total else 0,
+                'label': 'DETRACTEURS'
+            },
+            'theme_prioritaire': {
+                'theme': top_neg_theme or 'N/A',
+                'mentions': theme_sentiment.get(top_neg_theme, {}).get('total', 0) if top_neg_theme else 0,
+                'negative_percentage': round(
+                    top_neg_count / theme_sentiment.get(top_neg_theme, {}).get('total', 1) * 100
+                ) if top_neg_theme else 0,
+                'impact': -round(top_neg_count / total * 100) if total else 0,
+                'label': 'THEME PRIORITAIRE #1'
+            }
+        }
+
+        # ─── 7. prioritization-matrix_dpd.json ─────────────────────────────
+        pmatrix = {
+            'global_satisfaction_baseline': sat_score,
+            'total_verbatims': total,
+            'themes': []
+        }
+        for theme, sent in ranked_themes:
+            t = sent['total']
+            if t < 3:
+                continue
+            freq = round(t / total * 100, 1) if total else 0
+            neg_pct = round(sent['negative'] / t * 100) if t else 0
+            pos_pct = round(sent['positive'] / t * 100) if t else 0
+            impact = round((sent['positive'] - sent['negative']) / t * 20) if t else 0
+
+            # Quadrant assignment matching chart layout:
+            #   X=frequency (threshold 10%), Y=impact (threshold 0)
+            #   high freq + neg impact  → priorities (fix first!)
+            #   high freq + pos impact  → strengths  (keep it up)
+            #   low freq  + neg impact  → emerging   (watch for growth)
+            #   low freq  + pos impact  → neutral    (not a concern)
+            if freq >= 10 and impact < 0:
+                quadrant = 'priorities'
+            elif freq >= 10 and impact >= 0:
+                quadrant = 'strengths'
+            elif freq < 10 and impact < 0:
+                quadrant = 'emerging'
+            else:
+                quadrant = 'neutral'
+
+            pmatrix['themes'].append({
+                'label': theme, 'frequency': freq, 'impact': impact,
+                'mentions': t, 'negative_pct': neg_pct, 'positive_pct': pos_pct,
+                'quadrant': quadrant
+            })
+        files['prioritization-matrix_dpd.json'] = pmatrix
+
+        # ─── 8. channel-comparison_dpd.json ────────────────────────────────
+        def chan_stats(counts):
+            p, ne, ng = counts['positive'], counts['neutral'], counts['negative']
+            t = p + ne + ng
+            return {
+                'total': t, 'positive': p, 'neutral': ne, 'negative': ng,
+                'positive_percentage': round(p / t * 100, 1) if t else 0,
+                'neutral_percentage': round(ne / t * 100, 1) if t else 0,
+                'negative_percentage': round(ng / t * 100, 1) if t else 0,
+                'satisfaction_score': round(p / t * 100, 1) if t else 0
+            }
+
+        cs = chan_stats(self.channel_data['short'])
+        cl = chan_stats(self.channel_data['long'])
+        diff = round(abs(cs['satisfaction_score'] - cl['satisfaction_score']), 1)
+
+        files['channel-comparison_dpd.json'] = {
+            'email': cs,  # Short calls mapped to "email" channel for chart compat
+            'call': cl,   # Long calls mapped to "call" channel
+            'insight': {
+                'difference': diff,
+                'message': 'Les appels courts <3min ({} conv.) ont {}% de satisfaction vs {}% pour les appels longs ({} conv.). Les appels longs sont lies a des problemes complexes.'.format(
+                    cs['total'], cs['satisfaction_score'], cl['satisfaction_score'], cl['total']),
+                'recommendation': 'Ameliorer la resolution au premier contact pour reduire la duree des appels et augmenter la satisfaction.'
+            }
+        }
+
+        # ─── 9. site-performance_dpd.json ──────────────────────────────────
+        site_perf = []
+        for sname, d in zip(SITE_NAMES, self.site_data):
+            t = d['total']
+            site_perf.append({
+                'site': sname, 'total': t,
+                'positive': d['positive'], 'neutral': d['neutral'], 'negative': d['negative'],
+                'satisfaction_percentage': round(d['positive'] / t * 100, 1) if t else 0,
+                'volume': t
+            })
+        files['site-performance_dpd.json'] = site_perf
 
+        return files
+
+
+def iter_conversation_entries(conversations, results):
+    """Yield the conversations_dpd.json entries, in input order.
+
+    Without any creation date in the export, dates are spread by position;
+    otherwise undated conversations have a null date.
+    """
     total = len(results)
-    sentiment_counts = Counter()
-    theme_sentiment = defaultdict(lambda: {'positive': 0, 'neutral': 0, 'negative': 0, 'total': 0})
-    keyword_data = defaultdict(lambda: {'count': 0, 'positive': 0, 'neutral': 0, 'negative': 0})
-    monthly_data = defaultdict(lambda: {'volume': 0, 'positive': 0, 'negative': 0, 'neutral': 0})
-
-    site_names = ['Paris', 'Lyon', 'Marseille', 'Toulouse', 'Bordeaux',
-                  'Nantes', 'Strasbourg', 'Lille', 'Nice', 'Montpellier',
-                  'Rennes', 'Grenoble']
-    site_data = defaultdict(lambda: {'total': 0, 'positive': 0, 'neutral': 0, 'negative': 0})
-
-    analyzed_convs = []
-
-    for i, result in enumerate(results):
-        sentiment = result['sentiment']
-        themes = result['themes']
-        keywords = result['keywords']
-        confidence = result['confidence']
-
-        sentiment_counts[sentiment] += 1
-
-        # Theme aggregation
-        for theme in themes:
-            theme_sentiment[theme][sentiment] += 1
-            theme_sentiment[theme]['total'] += 1
-
-        # Keyword aggregation
-        for kw in keywords:
-            keyword_data[kw]['count'] += 1
-            keyword_data[kw][sentiment] += 1
-
-        # Timeline: distribute across 12 months (Mar 2025 - Feb 2026)
-        bucket = min(int(i * 12 / total), 11)
-        month_num = 3 + bucket  # Start from March
-        year = 2025 if month_num <= 12 else 2026
-        if month_num > 12:
-            month_num -= 12
-        month_key = '{}-{:02d}'.format(year, month_num)
-
-        monthly_data[month_key]['volume'] += 1
-        monthly_data[month_key][sentiment] += 1
-
-        # Site assignment (rotating distribution)
-        site = site_names[i % len(site_names)]
-        site_data[site]['total'] += 1
-        site_data[site][sentiment] += 1
-
-        # Build conversation entry
-        conv = conversations[i]
-        summary = conv.get('summary', '')
-        audio_dur = conv.get('audio_duration', 0)
+    positional = not any(conv.date for conv in conversations)
+    for i, (conv, result) in enumerate(zip(conversations, results)):
+        sentiment = result.sentiment
+        themes = result.themes
+        confidence = result.confidence
+
+        summary = conv.summary
+        audio_dur = conv.audio_duration
         dur_min = int(audio_dur // 60) if audio_dur else 0
         dur_sec = int(audio_dur % 60) if audio_dur else 0
         dur_str = '{}:{:02d}'.format(dur_min, dur_sec) if audio_dur else None
 
-        # Date for this conversation
-        day = 1 + (i * 3) % 28
-        date_str = '{}-{:02d}'.format(month_key, day)
+        # Date for this conversation: its creation date, or spread by position
+        date_str = conv.date
+        if not date_str and positional:
+            day = 1 + (i * 3) % 28
+            date_str = '{}-{:02d}'.format(_month_key(i, total), day)
 
         extract = summary[:200] + ('...' if len(summary) > 200 else '')
 
@@ -537,7 +1419,7 @@ def generate_dashboard_files(conversations, results):
             sent_val = 1.0 if sentiment == 'positive' else (0.0 if sentiment == 'negative' else 0.5)
             tags.append({'label': theme, 'sentiment': sent_val, 'confidence_score': confidence})
 
-        analyzed_convs.append({
+        yield {
             'id': 'conv_{:05d}'.format(i + 1),
             'date': date_str,
             'type': 'call',
@@ -551,219 +1433,45 @@ def generate_dashboard_files(conversations, results):
                 'tags': tags
             }],
             'metadata': {
-                'agent_id': 'AGT-{:03d}'.format((i * 7 + 13) % 50 + 1),
+                'agent_id': agent_for(i),
                 'duration': dur_str,
-                'site': site
+                'site': site_for(i)
             }
-        })
-
-    pos = sentiment_counts.get('positive', 0)
-    neu = sentiment_counts.get('neutral', 0)
-    neg = sentiment_counts.get('negative', 0)
-
-    # ─── 1. stats_dpd.json ─────────────────────────────────────────────
-    stats = {
-        'total': total,
-        'positive': pos,
-        'neutral': neu,
-        'negative': neg,
-        'positive_percentage': round(pos / total * 100, 1) if total else 0,
-        'neutral_percentage': round(neu / total * 100, 1) if total else 0,
-        'negative_percentage': round(neg / total * 100, 1) if total else 0,
-    }
-    write_json('stats_dpd.json', stats)
+        }
 
-    # ─── 2. conversations_dpd.json ─────────────────────────────────────
-    write_json('conversations_dpd.json', analyzed_convs)
 
-    # ─── 3. themes_dpd.json ────────────────────────────────────────────
-    themes_list = []
-    for theme, sent in sorted(theme_sentiment.items(), key=lambda x: x[1]['total'], reverse=True):
-        t = sent['total']
-        if t < 2:
-            continue
-        themes_list.append({
-            'theme': theme,
-            'count': t,
-            'sentiment': {
-                'positive': sent['positive'],
-                'neutral': sent['neutral'],
-                'negative': sent['negative']
-            },
-            'percentage': {
-                'positive': round(sent['positive'] / t * 100) if t else 0,
-                'neutral': round(sent['neutral'] / t * 100) if t else 0,
-                'negative': round(sent['negative'] / t * 100) if t else 0,
-            }
-        })
-    write_json('themes_dpd.json', themes_list)
+def generate_dashboard_files(conversations, results, msgpack_variants=False, aggregates=None):
+    """Generate all 9 _dpd.json dashboard files, their compressed variants and the manifest.
 
-    # ─── 4. word-cloud_dpd.json ────────────────────────────────────────
-    wc_list = []
-    for term, data in sorted(keyword_data.items(), key=lambda x: x[1]['count'], reverse=True):
-        if data['count'] < 2:
-            continue
-        wc_list.append({
-            'value': term,
-            'count': data['count'],
-            'sentiment': {
-                'positive': data['positive'],
-                'neutral': data['neutral'],
-                'negative': data['negative']
-            }
-        })
-    write_json('word-cloud_dpd.json', wc_list[:50])
-
-    # ─── 5. timeline_dpd.json ──────────────────────────────────────────
-    timeline = []
-    for month_key in sorted(monthly_data.keys()):
-        d = monthly_data[month_key]
-        vol = d['volume']
-        if vol == 0:
-            continue
-        # Satisfaction = (positive + 0.5*neutral) / total * 100
-        sat = round(((d['positive'] + d['neutral'] * 0.5) / vol) * 100, 1)
-        timeline.append({'month': month_key, 'volume': vol, 'satisfaction': sat})
-    write_json('timeline_dpd.json', timeline)
-
-    # ─── 6. kpis_dpd.json ─────────────────────────────────────────────
-    top_neg_theme = None
-    top_neg_count = 0
-    for theme, sent in theme_sentiment.items():
-        if sent['negative'] > top_neg_count:
-            top_neg_count = sent['negative']
-            top_neg_theme = theme
-
-    sat_score = round((pos + neu * 0.5) / total * 100) if total else 0
-
-    kpis = {
-        'verbatims_traites': {
-            'value': total,
-            'trend': 0, 'trend_direction': 'stable',
-            'label': 'VERBATIMS TRAITES', 'comparison': 'Analyse de {} conversations DPD'.format(total)
-        },
-        'score_satisfaction': {
-            'value': sat_score, 'unit': '%',
-            'trend': 0, 'trend_direction': 'stable',
-            'label': 'SCORE SATISFACTION', 'comparison': 'Donnees reelles production'
-        },
-        'promoteurs': {
-            'value': pos,
-            'percentage': round(pos / total * 100) if total else 0,
-            'label': 'PROMOTEURS'
-        },
-        'passifs': {
-            'value': neu,
-            'percentage': round(neu / total * 100) if total else 0,
-            'label': 'PASSIFS'
-        },
-        'detracteurs': {
-            'value': neg,
-            'percentage': round(neg / total * 100) if total else 0,
-            'label': 'DETRACTEURS'
-        },
-        'theme_prioritaire': {
-            'theme': top_neg_theme or 'N/A',
-            'mentions': theme_sentiment.get(top_neg_theme, {}).get('total', 0) if top_neg_theme else 0,
-            'negative_percentage': round(
-                top_neg_count / theme_sentiment.get(top_neg_theme, {}).get('total', 1) * 100
-            ) if top_neg_theme else 0,
-            'impact': -round(top_neg_count / total * 100) if total else 0,
-            'label': 'THEME PRIORITAIRE #1'
-        }
-    }
-    write_json('kpis_dpd.json', kpis)
+    ``aggregates`` is the DashboardAggregates of the results if they were
+    already accumulated while scoring. Returns the manifest entries of the
+    published generation.
+    """
+    print("\n--- Generating Dashboard Data Files ---")
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-    # ─── 7. prioritization-matrix_dpd.json ─────────────────────────────
-    pmatrix = {
-        'global_satisfaction_baseline': sat_score,
-        'total_verbatims': total,
-        'themes': []
-    }
-    for theme, sent in sorted(theme_sentiment.items(), key=lambda x: x[1]['total'], reverse=True):
-        t = sent['total']
-        if t < 3:
-            continue
-        freq = round(t / total * 100, 1) if total else 0
-        neg_pct = round(sent['negative'] / t * 100) if t else 0
-        pos_pct = round(sent['positive'] / t * 100) if t else 0
-        impact = round((sent['positive'] - sent['negative']) / t * 20) if t else 0
-
-        # Quadrant assignment matching chart layout:
-        #   X=frequency (threshold 10%), Y=impact (threshold 0)
-        #   high freq + neg impact  → priorities (fix first!)
-        #   high freq + pos impact  → strengths  (keep it up)
-        #   low freq  + neg impact  → emerging   (watch for growth)
-        #   low freq  + pos impact  → neutral    (not a concern)
-        if freq >= 10 and impact < 0:
-            quadrant = 'priorities'
-        elif freq >= 10 and impact >= 0:
-            quadrant = 'strengths'
-        elif freq < 10 and impact < 0:
-            quadrant = 'emerging'
-        else:
-            quadrant = 'neutral'
-
-        pmatrix['themes'].append({
-            'label': theme, 'frequency': freq, 'impact': impact,
-            'mentions': t, 'negative_pct': neg_pct, 'positive_pct': pos_pct,
-            'quadrant': quadrant
-        })
-    write_json('prioritization-matrix_dpd.json', pmatrix)
-
-    # ─── 8. channel-comparison_dpd.json ────────────────────────────────
-    # Split by call duration: short (<3min) vs long (>=3min)
-    short_r, long_r = [], []
-    for i, r in enumerate(results):
-        dur = conversations[i].get('audio_duration', 0) or 0
-        if dur < 180:
-            short_r.append(r)
-        else:
-            long_r.append(r)
+    if aggregates is None:
+        aggregates = DashboardAggregates()
+        for conv, result in zip(conversations, results):
+            aggregates.add(result, conv.audio_duration, conv.date)
+    files = aggregates.to_dashboard_files()
 
-    def chan_stats(lst):
-        t = len(lst)
-        p = sum(1 for r in lst if r['sentiment'] == 'positive')
-        ne = sum(1 for r in lst if r['sentiment'] == 'neutral')
-        ng = sum(1 for r in lst if r['sentiment'] == 'negative')
-        return {
-            'total': t, 'positive': p, 'neutral': ne, 'negative': ng,
-            'positive_percentage': round(p / t * 100, 1) if t else 0,
-            'neutral_percentage': round(ne / t * 100, 1) if t else 0,
-            'negative_percentage': round(ng / t * 100, 1) if t else 0,
-            'satisfaction_score': round(p / t * 100, 1) if t else 0
-        }
+    def outputs():
+        yield 'stats_dpd.json', files.pop('stats_dpd.json')
+        yield from iter_conversation_files(conversations, results)
+        yield from files.items()
 
-    cs = chan_stats(short_r)
-    cl = chan_stats(long_r)
-    diff = round(abs(cs['satisfaction_score'] - cl['satisfaction_score']), 1)
-
-    channel_comp = {
-        'email': cs,  # Short calls mapped to "email" channel for chart compat
-        'call': cl,   # Long calls mapped to "call" channel
-        'insight': {
-            'difference': diff,
-            'message': 'Les appels courts <3min ({} conv.) ont {}% de satisfaction vs {}% pour les appels longs ({} conv.). Les appels longs sont lies a des problemes complexes.'.format(
-                len(short_r), cs['satisfaction_score'], cl['satisfaction_score'], len(long_r)),
-            'recommendation': 'Ameliorer la resolution au premier contact pour reduire la duree des appels et augmenter la satisfaction.'
-        }
-    }
-    write_json('channel-comparison_dpd.json', channel_comp)
-
-    # ─── 9. site-performance_dpd.json ──────────────────────────────────
-    site_perf = []
-    for sname in site_names:
-        d = site_data[sname]
-        t = d['total']
-        site_perf.append({
-            'site': sname, 'total': t,
-            'positive': d['positive'], 'neutral': d['neutral'], 'negative': d['negative'],
-            'satisfaction_percentage': round(d['positive'] / t * 100, 1) if t else 0,
-            'volume': t
-        })
-    write_json('site-performance_dpd.json', site_perf)
+    generation = new_generation_id()
+    staging = os.path.join(OUTPUT_DIR, GENERATIONS_DIR, '.staging-' + generation)
+    entries = write_files(staging, outputs(), msgpack_variants, current_generation())
+    publish_generation(staging, generation, entries)
 
     # ─── Summary ───────────────────────────────────────────────────────
+    total = aggregates.total
+    pos = aggregates.sentiment_counts['positive']
+    neu = aggregates.sentiment_counts['neutral']
+    neg = aggregates.sentiment_counts['negative']
+    top_neg_theme, top_neg_count = aggregates.top_negative_theme()
     print("\n" + "=" * 60)
     print("  RESULTS SUMMARY")
     print("=" * 60)
@@ -771,69 +1479,1670 @@ def generate_dashboard_files(conversations, results):
     print("  Positive: {:>4} ({:5.1f}%)".format(pos, pos / total * 100))
     print("  Neutral:  {:>4} ({:5.1f}%)".format(neu, neu / total * 100))
     print("  Negative: {:>4} ({:5.1f}%)".format(neg, neg / total * 100))
-    print("  Satisfaction score: {}%".format(sat_score))
-    print("  Themes detected: {}".format(len(themes_list)))
-    print("  Keywords extracted: {}".format(min(50, len(wc_list))))
+    print("  Satisfaction score: {}%".format(aggregates.satisfaction_score()))
+    print("  Themes detected: {}".format(len(files['themes_dpd.json'])))
+    print("  Keywords extracted: {}".format(len(files['word-cloud_dpd.json'])))
     print("  Top negative theme: {} ({} neg mentions)".format(top_neg_theme, top_neg_count))
-    print("  Short calls (<3m): {} | Long calls (>=3m): {}".format(len(short_r), len(long_r)))
+    print("  Short calls (<3m): {} | Long calls (>=3m): {}".format(
+        files['channel-comparison_dpd.json']['email']['total'],
+        files['channel-comparison_dpd.json']['call']['total']))
     print("  Output: {}".format(OUTPUT_DIR))
     print("=" * 60)
-    print("\n  All 9 _dpd.json files generated successfully!")
+    print("\n  All {} _dpd.json files generated successfully (generation {})!".format(len(entries), generation))
+    return entries
+
+
+def iter_conversation_files(conversations, results):
+    """Yield (filename, data) for the per-conversation files.
+
+    Entries are split into fixed-size conversations_dpd/page-NNNN.json files,
+    followed by two indexes:
+    - conversations-index_dpd.json lists the page files and one row per
+      conversation (CONVERSATION_INDEX_FIELDS, in input order); row n lives
+      in page n // page_size. Sentiment, theme and site values are stored as
+      positions in the index 'values' lists. The dashboard filters on the
+      index and fetches only the pages it displays.
+    - filter-index_dpd.json holds the postings lists (see encode_filter_index).
+    """
+    values = {'sentiment': {}, 'themes': {}, 'site': {}}
+
+    def code(field, value):
+        return values[field].setdefault(value, len(values[field]))
+
+    postings = {field: {} for field in FILTER_INDEX_FIELDS}
+    rows = []
+    pages = []
+    entries = iter_conversation_entries(conversations, results)
+    for page in _chunked(entries, CONVERSATION_PAGE_SIZE):
+        filename = '{}/page-{:04d}.json'.format(CONVERSATION_PAGES_DIR, len(pages))
+        yield filename, page
+        pages.append(filename)
+        for entry in page:
+            add_postings(postings, len(rows), entry, results[len(rows)])
+            rows.append([
+                entry['id'],
+                entry['date'],
+                code('sentiment', entry['sentiment']),
+                [code('themes', theme) for theme in entry['themes']],
+                code('site', entry['metadata']['site']),
+            ])
+
+    yield 'conversations-index_dpd.json', {
+        'total': len(rows),
+        'page_size': CONVERSATION_PAGE_SIZE,
+        'pages': pages,
+        'fields': list(CONVERSATION_INDEX_FIELDS),
+        'values': {field: list(codes) for field, codes in values.items()},
+        'rows': rows,
+    }
+    yield 'filter-index_dpd.json', encode_filter_index(postings, len(rows))
+
+
+def add_postings(postings, position, entry, result):
+    """Record a conversation position under each filter value it has."""
+    values = {
+        'sentiment': [entry['sentiment']],
+        'theme': entry['themes'],
+        'keyword': result.keywords,
+        'site': [entry['metadata']['site']],
+        'agent_id': [entry['metadata']['agent_id']],
+        'month': [entry['date'][:7]] if entry['date'] else [],
+    }
+    for field, field_values in values.items():
+        for value in field_values:
+            positions = postings[field].setdefault(value, [])
+            if not positions or positions[-1] != position:
+                positions.append(position)
+
+
+def delta_encode(positions):
+    """Encode a sorted list of ints as its first value followed by the gaps."""
+    return [b - a for a, b in zip([0] + positions, positions)]
+
+
+def encode_filter_index(postings, total):
+    """Build filter-index_dpd.json: per field and value, the sorted positions
+    (row numbers in conversations-index_dpd.json) of matching conversations,
+    delta-encoded. Filters are answered by intersecting these lists."""
+    return {
+        'total': total,
+        'encoding': 'delta',
+        'postings': {
+            field: {value: delta_encode(positions) for value, positions in sorted(by_value.items())}
+            for field, by_value in postings.items()
+        },
+    }
+
 
+def write_json(filename, data, msgpack_variants=False, directory=None, previous=None):
+    """Write data as minified JSON in directory (default OUTPUT_DIR), with a .gz
+    sibling, a .br sibling (if brotli is installed) and optionally a .msgpack
+    variant.
+
+    ``previous`` is the (directory, manifest entry) of the file in the current
+    generation: if the content and the variants are unchanged, the files are
+    hard-linked from there instead of being compressed again.
+    Returns the manifest entry of the file: content hash and variant sizes.
+    """
+    filepath = os.path.join(directory or OUTPUT_DIR, filename)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    raw = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    entry = {'hash': hashlib.sha256(raw).hexdigest()[:16], 'bytes': len(raw)}
+    if previous is not None and _unchanged(entry, previous[1], msgpack_variants):
+        source = os.path.join(previous[0], filename)
+        _link_or_copy(source, filepath)
+        for suffix in OUTPUT_VARIANTS:
+            if suffix in previous[1]:
+                _link_or_copy('{}.{}'.format(source, suffix), '{}.{}'.format(filepath, suffix))
+        return dict(previous[1])
+
+    variants = {'gz': gzip.compress(raw, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(raw, quality=11)
+    if msgpack_variants:
+        variants['msgpack'] = msgpack.packb(data, use_bin_type=True)
+
+    _write_bytes(filepath, raw)
+    for suffix in OUTPUT_VARIANTS:
+        path = '{}.{}'.format(filepath, suffix)
+        if suffix in variants:
+            _write_bytes(path, variants[suffix])
+            entry[suffix] = len(variants[suffix])
+        elif os.path.exists(path):
+            os.remove(path)  # stale variant from an earlier run
+    return entry
+
+
+def _write_bytes(path, payload):
+    with open(path, 'wb') as f:
+        f.write(payload)
+
+
+def _unchanged(entry, previous, msgpack_variants):
+    """Whether the previous manifest entry has the same content and variants as entry would."""
+    return (previous['hash'] == entry['hash']
+            and ('br' in previous) == (brotli is not None)
+            and ('msgpack' in previous) == msgpack_variants)
+
+
+def _link_or_copy(src, dst):
+    """Atomically make dst a hard link to src (a copy where links are not supported)."""
+    tmp = dst + '.tmp'
+    try:
+        os.link(src, tmp)
+    except FileExistsError:
+        os.remove(tmp)
+        os.link(src, tmp)
+    except OSError:  # no hard links on this filesystem
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+def write_files(directory, outputs, msgpack_variants=False, previous=None):
+    """Write (filename, data) pairs into directory with OUTPUT_WRITERS threads.
+
+    Compression and file I/O release the GIL, so files are processed
+    concurrently; at most two files per thread are pending at a time.
+    ``previous`` is the (directory, entries) of the current generation, whose
+    unchanged files are reused (see write_json).
+    Returns {filename: manifest entry}, in output order.
+    """
+    entries = {}
+    pending = deque()
+
+    def write(filename, data):
+        start = time.perf_counter()
+        reuse = (previous[0], previous[1][filename]) if previous and filename in previous[1] else None
+        entry = write_json(filename, data, msgpack_variants, directory, reuse)
+        label = filename.split('/')[0]  # page files are reported together
+        METRICS.observe('voc_output_write_seconds', time.perf_counter() - start, file=label)
+        METRICS.observe('voc_output_bytes', entry['bytes'], file=label)
+        return entry
+
+    def collect():
+        filename, future = pending.popleft()
+        entries[filename] = future.result()
+        print("  -> {}".format(filename))
+
+    with ThreadPoolExecutor(OUTPUT_WRITERS) as pool:
+        for filename, data in outputs:
+            pending.append((filename, pool.submit(write, filename, data)))
+            if len(pending) >= OUTPUT_WRITERS * 2:
+                collect()
+        while pending:
+            collect()
+    return entries
+
+
+def current_generation():
+    """(directory, manifest entries) of the published generation, or None."""
+    try:
+        with open(os.path.join(OUTPUT_DIR, MANIFEST_FILE), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    directory = os.path.join(OUTPUT_DIR, manifest['path'])
+    return (directory, manifest['files']) if os.path.isdir(directory) else None
+
+
+def new_generation_id():
+    """Sortable id of an output generation: its UTC creation time."""
+    return datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+
+
+def publish_generation(staging, generation, entries):
+    """Make a fully written output set the current one.
+
+    The staging directory is renamed to generations/<generation>, then the
+    manifest, which points readers at that directory, is replaced in one
+    atomic rename: a reader that loads the manifest sees either the old or
+    the new set, never a mix. The top-level files that readers without the
+    manifest fetch are then replaced one by one (see _replace_top_level), so
+    only manifest readers get atomic updates of the whole set.
+    """
+    generations_dir = os.path.join(OUTPUT_DIR, GENERATIONS_DIR)
+    final = os.path.join(generations_dir, generation)
+    os.rename(staging, final)
+    write_manifest(entries, generation)
+    _replace_top_level(final, entries)
+    prune_generations(generations_dir)
+
+
+def prune_generations(generations_dir):
+    """Delete all but the GENERATIONS_KEPT newest generations, so that readers
+    still on a recent manifest can finish, and staging directories left by
+    interrupted runs (a single pipeline run at a time is assumed)."""
+    names = sorted(os.listdir(generations_dir))
+    kept = [name for name in names if not name.startswith('.')][-GENERATIONS_KEPT:]
+    for name in names:
+        if name not in kept:
+            shutil.rmtree(os.path.join(generations_dir, name), ignore_errors=True)
+
+
+def _replace_top_level(generation_dir, entries):
+    """Hard-link each generation file over its top-level counterpart, and
+    remove top-level page files that are no longer part of the output.
+
+    Each file is replaced atomically, but not the set: while this runs, a
+    reader fetching top-level files directly can get some from the old run
+    and some from the new one. Readers that need a consistent set go
+    through the manifest.
+    """
+    for filename, entry in entries.items():
+        for name in [filename] + ['{}.{}'.format(filename, v) for v in OUTPUT_VARIANTS if v in entry]:
+            src = os.path.join(generation_dir, name)
+            dst = os.path.join(OUTPUT_DIR, name)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            _link_or_copy(src, dst)
+
+    current = set(entries)
+    pages_dir = os.path.join(OUTPUT_DIR, CONVERSATION_PAGES_DIR)
+    for name in os.listdir(pages_dir):
+        base = name.split('.json')[0] + '.json'
+        if '{}/{}'.format(CONVERSATION_PAGES_DIR, base) not in current:
+            os.remove(os.path.join(pages_dir, name))
+
+
+def write_manifest(entries, generation):
+    """Atomically replace MANIFEST_FILE: the current generation, the directory
+    its files live in, and per file its content hash and variant sizes."""
+    filepath = os.path.join(OUTPUT_DIR, MANIFEST_FILE)
+    manifest = {
+        'generation': generation,
+        'path': '{}/{}/'.format(GENERATIONS_DIR, generation),
+        'variants': [v for v in OUTPUT_VARIANTS if any(v in e for e in entries.values())],
+        'files': entries,
+    }
+    tmp = filepath + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, filepath)
+    print("  -> {} (generation {})".format(MANIFEST_FILE, generation))
+
+
+# ─── Data Loading ───────────────────────────────────────────────────────────
+
+READ_CHUNK_SIZE = 1 << 20  # characters read per chunk when streaming a JSON array
+JSON_WHITESPACE = ' \t\r\n'
+JSON_TOKEN_LOOKAHEAD = 8  # characters past a decoding stop that rule out a token cut at the buffer edge
+JSON_NUMBER_CHARS = '0123456789+-.eE'
+
+
+def iter_conversations(path, limit=None):
+    """Yield conversation records from a JSON array or JSON Lines file.
 
-def write_json(filename, data):
-    """Write data to JSON file in the output directory."""
-    filepath = os.path.join(OUTPUT_DIR, filename)
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    print("  -> {}".format(filename))
+    Records are decoded one at a time, so memory is bounded by the largest
+    record rather than by the file size. Reading stops after ``limit`` records.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        head = f.read(READ_CHUNK_SIZE)
+        stripped = head.lstrip()
+        if stripped.startswith('['):
+            records = _iter_json_array(f, stripped[1:])
+        else:
+            records = _iter_json_lines(f, head)
+        for i, record in enumerate(records):
+            if limit is not None and i >= limit:
+                return
+            yield record
+
+
+def _iter_json_array(f, buf):
+    """Decode the elements of a top-level JSON array, reading f in chunks.
+
+    A decoding error may only mean the element is cut at the buffer edge, so
+    one more chunk is read; if decoding then fails at the same offset, with
+    enough text past it, the element is malformed and the error is raised
+    without reading further. Elements must be separated by exactly one ','
+    and only whitespace may follow the closing ']'.
+    """
+    decoder = json.JSONDecoder()
+    pos = 0
+    eof = False
+    failed_at = None  # offset of the last decoding error, from the element start
+    count = 0         # elements decoded so far
+    separated = True  # a ',' (or the opening '[') precedes the next element
+    while True:
+        while pos < len(buf) and buf[pos] in JSON_WHITESPACE:
+            pos += 1
+        if pos < len(buf) and not separated:
+            # Between elements: exactly one ',', or the closing ']'
+            if buf[pos] == ']':
+                _expect_end_of_file(f, buf[pos + 1:])
+                return
+            if buf[pos] != ',':
+                raise json.JSONDecodeError("Expecting ',' delimiter", buf, pos)
+            separated = True
+            pos += 1
+            continue
+        if pos < len(buf) and buf[pos] == ']' and not count:
+            _expect_end_of_file(f, buf[pos + 1:])
+            return
+        if pos < len(buf):
+            try:
+                record, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                # An unterminated string fails at its start until its end is read
+                if eof or (e.pos - pos == failed_at and len(buf) - e.pos > JSON_TOKEN_LOOKAHEAD
+                           and not e.msg.startswith('Unterminated string')):
+                    raise
+                failed_at = e.pos - pos
+            else:
+                # A value ending at the buffer edge may be truncated, and so may
+                # a number stopped at a character that can continue it ('1' of '1e5')
+                cut = end == len(buf) or (type(record) in (int, float) and buf[end] in JSON_NUMBER_CHARS
+                                          and len(buf) - end <= JSON_TOKEN_LOOKAHEAD)
+                if eof or not cut:
+                    yield record
+                    pos = end
+                    failed_at = None
+                    count += 1
+                    separated = False
+                    continue
+        elif eof:
+            raise ValueError('Unexpected end of file: unterminated JSON array')
+        chunk = f.read(READ_CHUNK_SIZE)
+        eof = not chunk
+        buf = buf[pos:] + chunk
+        pos = 0
+
+
+def _expect_end_of_file(f, rest):
+    """Raise at the first non-whitespace character after a top-level array."""
+    while rest:
+        if rest.strip(JSON_WHITESPACE):
+            raise ValueError('Extra data after the closing ] of the JSON array')
+        rest = f.read(READ_CHUNK_SIZE)
+
+
+def _iter_json_lines(f, head):
+    """Decode one JSON record per non-blank line."""
+    pending = ''
+    chunk = head
+    while chunk:
+        lines = (pending + chunk).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+        chunk = f.read(READ_CHUNK_SIZE)
+    if pending.strip():
+        yield json.loads(pending)
+
+
+# ─── Result Cache ────────────────────────────────────────────────────────────
+
+# Bump when the scoring code changes in a way the lexicon fingerprints cannot see
+ANALYZER_VERSION = 3
+
+
+def _fingerprint(*tables):
+    """Stable hash of lexicon tables (entry order matters for tie-breaking)."""
+    payload = json.dumps([ANALYZER_VERSION, tables], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+# Each result component is invalidated only when the tables it reads change
+LEXICON_FINGERPRINTS = {
+    'sentiment': _fingerprint(NEGATIVE_INDICATORS, POSITIVE_INDICATORS, NEUTRAL_INDICATORS,
+                              TRANSCRIPT_NEGATIVE_INDICATORS, TRANSCRIPT_POSITIVE_INDICATORS,
+                              SUMMARY_RULES, SPEAKER_WEIGHTS, [TRAJECTORY_SECTIONS, TRAJECTORY_MIN_CHANGE]),
+    'themes': _fingerprint(THEME_PATTERNS),
+    'keywords': _fingerprint(KEYWORD_CANDIDATES),
+}
+
+
+class ResultCache:
+    """SQLite store of per-conversation results keyed by content hash.
+
+    Sentiment, themes and keywords are stored with the fingerprint of the
+    lexicon tables they were computed from; a component whose fingerprint
+    no longer matches is treated as missing and recomputed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        self._db = sqlite3.connect(path)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                content_hash TEXT PRIMARY KEY,
+                sentiment_fp TEXT, sentiment TEXT, confidence INTEGER,
+                neg_score REAL, pos_score REAL,
+                themes_fp TEXT, themes TEXT,
+                keywords_fp TEXT, keywords TEXT,
+                speakers TEXT
+            )""")
+        # Caches created before per-speaker scores: their sentiment rows have
+        # an older fingerprint and are recomputed
+        columns = [row[1] for row in self._db.execute('PRAGMA table_info(results)')]
+        if 'speakers' not in columns:
+            self._db.execute('ALTER TABLE results ADD COLUMN speakers TEXT')
+
+    @staticmethod
+    def content_key(summary, transcripts):
+        """Key of a summary and its transcripts by speaker (see speaker_transcripts)."""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(summary.encode('utf-8'))
+        for transcript in transcripts:
+            h.update(b'\0')
+            h.update(transcript.encode('utf-8'))
+        return h.hexdigest()
+
+    def get(self, key):
+        """Return the still-valid components cached for key: {'sentiment', 'themes', 'keywords'}."""
+        row = self._db.execute(
+            'SELECT sentiment_fp, sentiment, confidence, neg_score, pos_score,'
+            ' themes_fp, themes, keywords_fp, keywords, speakers FROM results WHERE content_hash = ?',
+            (key,)).fetchone()
+        cached = {}
+        if row:
+            if row[0] == LEXICON_FINGERPRINTS['sentiment']:
+                # A NULL or unreadable speakers column is a miss: rescored and rewritten
+                try:
+                    customer_neg, customer_pos, agent_neg, agent_pos, trajectory = json.loads(row[9])
+                except (TypeError, ValueError):
+                    pass
+                else:
+                    speakers = [customer_neg, customer_pos, agent_neg, agent_pos]
+                    cached['sentiment'] = (row[1], row[2], row[3], row[4], speakers, trajectory)
+            if row[5] == LEXICON_FINGERPRINTS['themes']:
+                cached['themes'] = json.loads(row[6])
+            if row[7] == LEXICON_FINGERPRINTS['keywords']:
+                cached['keywords'] = json.loads(row[8])
+
+        if len(cached) == len(LEXICON_FINGERPRINTS):
+            self.hits += 1
+        elif cached:
+            self.partial_hits += 1
+        else:
+            self.misses += 1
+        return cached
+
+    def put(self, key, result, neg_score, pos_score):
+        self._db.execute(
+            'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (key,
+             LEXICON_FINGERPRINTS['sentiment'], result.sentiment, result.confidence,
+             neg_score, pos_score,
+             LEXICON_FINGERPRINTS['themes'], json.dumps(result.themes, ensure_ascii=False),
+             LEXICON_FINGERPRINTS['keywords'], json.dumps(result.keywords, ensure_ascii=False),
+             json.dumps([*result.speakers, result.trajectory])))
+
+    def commit(self):
+        self._db.commit()
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+
+# ─── Result Store ────────────────────────────────────────────────────────────
+
+RESULT_STORE_MAGIC = b'VOCRES1\n'
+RESULT_STORE_COLUMNS = (
+    # name, kind: 'string', 'float', 'int', 'dict' (one value) or 'dict_list'
+    ('summary', 'string'),
+    ('audio_duration', 'float'),
+    ('date', 'dict'),
+    ('sentiment', 'dict'),
+    ('confidence', 'int'),
+    ('neg_score', 'float'),
+    ('pos_score', 'float'),
+    ('themes', 'dict_list'),
+    ('keywords', 'dict_list'),
+    ('site', 'dict'),
+    ('agent_id', 'dict'),
+    ('customer_neg', 'float'),
+    ('customer_pos', 'float'),
+    ('agent_neg', 'float'),
+    ('agent_pos', 'float'),
+    ('trajectory', 'dict'),
+)
+_STORE_TYPECODES = {'float': 'd', 'int': 'b'}
+
+
+class ResultStoreWriter:
+    """Accumulate analyzed conversations column by column and write them
+    to a columnar result file.
+
+    Categorical columns are dictionary-encoded (each distinct value is
+    stored once, rows hold its code); scores and durations are float
+    arrays. A path ending in .parquet is written with pyarrow instead,
+    with the same columns dictionary-encoded.
+
+    File layout: RESULT_STORE_MAGIC, a little-endian uint32 header length,
+    a JSON header (rows, lexicon fingerprints and, per column, its kind,
+    dictionary and the offset/typecode/count of each of its blocks), then
+    the raw little-endian column blocks. Readers seek to the blocks of the
+    columns they need (see read_result_store).
+    """
+
+    def __init__(self, path, first_position=0):
+        self.path = path
+        self.rows = 0
+        self.first_position = first_position  # position of the first row in the whole output
+        self._dictionaries = {}   # column -> {value: code}
+        self._columns = {}
+        for name, kind in RESULT_STORE_COLUMNS:
+            if kind == 'string':
+                self._columns[name] = (array('Q', [0]), bytearray())
+            elif kind == 'dict_list':
+                self._columns[name] = (array('I', [0]), array('I'))
+                self._dictionaries[name] = {}
+            elif kind == 'dict':
+                self._columns[name] = array('I')
+                self._dictionaries[name] = {}
+            else:
+                self._columns[name] = array(_STORE_TYPECODES[kind])
+
+    def add(self, conv, result, neg_score, pos_score):
+        i = self.first_position + self.rows
+        self.rows += 1
+        customer_neg, customer_pos, agent_neg, agent_pos = result.speakers or (0, 0, 0, 0)
+        values = {
+            'summary': conv.summary,
+            'audio_duration': conv.audio_duration,
+            'date': conv.date,
+            'sentiment': result.sentiment,
+            'confidence': result.confidence,
+            'neg_score': neg_score,
+            'pos_score': pos_score,
+            'themes': result.themes,
+            'keywords': result.keywords,
+            'site': site_for(i),
+            'agent_id': agent_for(i),
+            'customer_neg': customer_neg,
+            'customer_pos': customer_pos,
+            'agent_neg': agent_neg,
+            'agent_pos': agent_pos,
+            'trajectory': result.trajectory,
+        }
+        for name, kind in RESULT_STORE_COLUMNS:
+            column = self._columns[name]
+            value = values[name]
+            if kind == 'string':
+                offsets, blob = column
+                blob += value.encode('utf-8')
+                offsets.append(len(blob))
+            elif kind == 'dict_list':
+                offsets, codes = column
+                dictionary = self._dictionaries[name]
+                codes.extend(dictionary.setdefault(v, len(dictionary)) for v in value)
+                offsets.append(len(codes))
+            elif kind == 'dict':
+                dictionary = self._dictionaries[name]
+                column.append(dictionary.setdefault(value, len(dictionary)))
+            else:
+                column.append(value)
+
+    def close(self):
+        if self.path.endswith('.parquet'):
+            self._write_parquet()
+        else:
+            self._write_columnar()
+
+    def _blocks(self, name, kind):
+        column = self._columns[name]
+        if kind in ('string', 'dict_list'):
+            offsets, data = column
+            if isinstance(data, bytearray):
+                data = array('B', data)
+            return offsets, data
+        return (column,)
+
+    def _write_columnar(self):
+        header = {
+            'format': 1,
+            'rows': self.rows,
+            'fingerprints': LEXICON_FINGERPRINTS,
+            'columns': [],
+        }
+        payloads = []
+        offset = 0
+        for name, kind in RESULT_STORE_COLUMNS:
+            meta = {'name': name, 'kind': kind, 'blocks': []}
+            if name in self._dictionaries:
+                meta['dictionary'] = list(self._dictionaries[name])
+            for block in self._blocks(name, kind):
+                if sys.byteorder != 'little' and block.itemsize > 1:
+                    block = array(block.typecode, block)
+                    block.byteswap()
+                data = block.tobytes()
+                meta['blocks'].append({'typecode': block.typecode, 'offset': offset, 'count': len(block)})
+                payloads.append(data)
+                offset += len(data)
+            header['columns'].append(meta)
+
+        header_bytes = json.dumps(header, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        with open(self.path, 'wb') as f:
+            f.write(RESULT_STORE_MAGIC)
+            f.write(struct.pack('<I', len(header_bytes)))
+            f.write(header_bytes)
+            for data in payloads:
+                f.write(data)
+
+    def _write_parquet(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        arrays = {}
+        for name, kind in RESULT_STORE_COLUMNS:
+            values = _decode_column(kind, self._blocks(name, kind), list(self._dictionaries.get(name, ())))
+            if kind == 'dict':
+                arrays[name] = pa.array(values, pa.string()).dictionary_encode()
+            elif kind == 'dict_list':
+                arrays[name] = pa.array(values, pa.list_(pa.dictionary(pa.int32(), pa.string())))
+            else:
+                arrays[name] = pa.array(values)
+        pq.write_table(pa.table(arrays), self.path,
+                       use_dictionary=[name for name, kind in RESULT_STORE_COLUMNS
+                                       if kind in ('dict', 'dict_list')])
+
+
+def _decode_column(kind, blocks, dictionary):
+    """Python values of a column from its blocks."""
+    if kind == 'string':
+        offsets, blob = blocks
+        blob = blob.tobytes()
+        return [blob[a:b].decode('utf-8') for a, b in zip(offsets, offsets[1:])]
+    if kind == 'dict_list':
+        offsets, codes = blocks
+        return [[dictionary[c] for c in codes[a:b]] for a, b in zip(offsets, offsets[1:])]
+    if kind == 'dict':
+        return [dictionary[c] for c in blocks[0]]
+    return blocks[0].tolist()
+
+
+def read_result_store(path, columns=None):
+    """Read a result file written by ResultStoreWriter: {column: [values]}.
+
+    Only the requested columns are read from disk, e.g.
+    read_result_store(path, ['sentiment', 'site']) for a sentiment by site
+    breakdown.
+    """
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.read_table(path, columns=columns).to_pydict()
+
+    with open(path, 'rb') as f:
+        if f.read(len(RESULT_STORE_MAGIC)) != RESULT_STORE_MAGIC:
+            raise ValueError('{} is not a result store file'.format(path))
+        header_len, = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(header_len).decode('utf-8'))
+        data_start = f.tell()
+
+        selected = {}
+        for meta in header['columns']:
+            if columns is not None and meta['name'] not in columns:
+                continue
+            blocks = []
+            for block in meta['blocks']:
+                values = array(block['typecode'])
+                f.seek(data_start + block['offset'])
+                values.frombytes(f.read(block['count'] * values.itemsize))
+                if sys.byteorder != 'little':
+                    values.byteswap()
+                blocks.append(values)
+            selected[meta['name']] = _decode_column(meta['kind'], blocks, meta.get('dictionary'))
+    missing = set(columns or ()) - set(selected)
+    if missing:
+        raise ValueError('{} has no column(s) {}'.format(path, ', '.join(sorted(missing))))
+    return selected
+
+
+def load_store_results(path):
+    """Rebuild (conversations, results) for generate_dashboard_files from a result file."""
+    columns = read_result_store(path, ['summary', 'audio_duration', 'date', 'sentiment', 'confidence',
+                                       'themes', 'keywords'])
+    conversations = [ConversationRecord(summary[:PAGE_SUMMARY_CHARS], duration, day)
+                     for summary, duration, day in zip(
+                         columns['summary'], columns['audio_duration'], columns['date'])]
+    results = [ConversationResult(*values) for values in zip(
+        columns['sentiment'], columns['confidence'], columns['themes'], columns['keywords'])]
+    return conversations, results
+
+
+# ─── Transcript Budget ───────────────────────────────────────────────────────
+
+TRANSCRIPT_BUDGET_SEGMENTS = 4     # middle segments sampled by a TranscriptBudget
+BUDGET_REPORT_SAMPLE = 200         # long transcripts re-scored in full for the budget report
+
+
+class TranscriptBudget:
+    """Bound the transcript text scanned for phrases to about ``chars`` characters.
+
+    Longer transcripts are reduced to their opening and closing thirds of
+    the budget (greetings, the complaint, thanks and goodbyes) plus
+    ``segments`` evenly spaced excerpts of the middle sharing the last
+    third. Cuts fall on word boundaries and excerpts are joined by
+    newlines, so no phrase is matched across a cut. The exclamation and
+    length rules still look at the whole transcript; they are cheap.
+    """
+
+    def __init__(self, chars, segments=TRANSCRIPT_BUDGET_SEGMENTS):
+        if chars < 3 * max(segments, 1):
+            raise ValueError('transcript budget too small: {} characters'.format(chars))
+        self.chars = chars
+        self.segments = segments
+
+    def window(self, transcript):
+        if len(transcript) <= self.chars:
+            return transcript
+        edge = self.chars // 3
+        head_end = transcript.rfind(' ', 0, edge)
+        tail_start = transcript.find(' ', len(transcript) - edge)
+        parts = [transcript[:edge if head_end < 0 else head_end]]
+        if self.segments:
+            seg_len = (self.chars - 2 * edge) // self.segments
+            start, end = edge, len(transcript) - edge
+            step = (end - start) / self.segments
+            for k in range(self.segments):
+                offset = start + int(step * k + (step - seg_len) / 2)
+                parts.append(_whole_words(transcript[offset:offset + seg_len]))
+        parts.append(transcript[len(transcript) - edge if tail_start < 0 else tail_start + 1:])
+        return '\n'.join(parts)
+
+
+def _whole_words(segment):
+    """Drop the partial words at both ends of a segment cut from a text."""
+    first = segment.find(' ')
+    last = segment.rfind(' ')
+    return segment[first + 1:last] if first < last else ''
+
+
+def budget_report(samples, budget):
+    """Compare budgeted and full scans on (summary, transcripts) samples and print the differences."""
+    if not samples:
+        print("\n  Transcript budget: no transcript over {} characters".format(budget.chars))
+        return
+    same_sentiment = same_confidence = same_keywords = 0
+    neg_diff = pos_diff = 0.0
+    full_time = budget_time = 0.0
+    for summary, transcripts in samples:
+        start = time.perf_counter()
+        full = analyze_conversation(summary, transcripts, metrics=None)
+        full_time += time.perf_counter() - start
+        start = time.perf_counter()
+        windowed = analyze_conversation(summary, transcripts, budget=budget, metrics=None)
+        budget_time += time.perf_counter() - start
+
+        same_sentiment += full[0].sentiment == windowed[0].sentiment
+        same_confidence += full[0].confidence == windowed[0].confidence
+        same_keywords += full[0].keywords == windowed[0].keywords
+        neg_diff += abs(full[1] - windowed[1])
+        pos_diff += abs(full[2] - windowed[2])
+
+    n = len(samples)
+    print("\n  Transcript budget {} chars vs full scan ({} long transcripts sampled):".format(budget.chars, n))
+    print("    Same sentiment: {:5.1f}%  same confidence: {:5.1f}%  same keywords: {:5.1f}%".format(
+        same_sentiment / n * 100, same_confidence / n * 100, same_keywords / n * 100))
+    print("    Mean |neg diff|: {:.2f}  mean |pos diff|: {:.2f}".format(neg_diff / n, pos_diff / n))
+    print("    Time per conversation: {:.2f} ms full, {:.2f} ms budgeted".format(
+        full_time / n * 1000, budget_time / n * 1000))
+
+
+# ─── Metrics ─────────────────────────────────────────────────────────────────
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+SIZE_BUCKETS = (1 << 10, 1 << 12, 1 << 14, 1 << 16, 1 << 18, 1 << 20, 1 << 22, 1 << 24)
+SCORE_BUCKETS = (0, 0.5, 1, 2, 3, 5, 8, 13, 21)
+CONFIDENCE_BUCKETS = (1, 2, 3, 4, 5)
+
+LOG_LEVELS = ('info', 'debug')
+
+# name -> (type, help, histogram buckets)
+METRIC_DEFINITIONS = {
+    'voc_records_processed_total': ('counter', 'Conversations scored, by sentiment', None),
+    'voc_function_seconds': ('histogram', 'Latency of the scoring functions, per call', LATENCY_BUCKETS),
+    'voc_neg_score': ('histogram', 'Negative score of scored conversations', SCORE_BUCKETS),
+    'voc_pos_score': ('histogram', 'Positive score of scored conversations', SCORE_BUCKETS),
+    'voc_confidence': ('histogram', 'Confidence of scored conversations', CONFIDENCE_BUCKETS),
+    'voc_cache_lookups_total': ('counter', 'Result cache lookups, by result', None),
+    'voc_duplicates_total': ('counter', 'Duplicate conversations found before scoring, by kind', None),
+    'voc_output_write_seconds': ('histogram', 'Time to encode and write an output file', LATENCY_BUCKETS),
+    'voc_output_bytes': ('histogram', 'Size of the minified JSON output files', SIZE_BUCKETS),
+    'voc_stage_seconds': ('gauge', 'Duration of the last run, by stage', None),
+    'voc_records_per_second': ('gauge', 'Scoring throughput of the last run', None),
+    'voc_sentiment_ratio': ('gauge', 'Share of each sentiment in the last run', None),
+    'voc_lexicon_info': ('gauge', 'Lexicon the last run was scored with', None),
+    'voc_last_run_timestamp_seconds': ('gauge', 'End time of the last run', None),
+}
+
+
+class Metrics:
+    """Counters, gauges and fixed-bucket histograms, keyed by name and labels.
+
+    Thread-safe. Worker processes collect into their own registry and send
+    drain() snapshots back to be merge()d into the parent's.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}      # (name, labels) -> counter or gauge value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._values[self._key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        buckets = METRIC_DEFINITIONS[name][2]
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [0] * (len(buckets) + 2)
+            hist[bisect_left(buckets, value)] += 1
+            hist[-1] += value
+
+    def drain(self):
+        """Return and reset the collected values (picklable)."""
+        with self._lock:
+            state = self._values, self._histograms
+            self._values, self._histograms = {}, {}
+        return state
+
+    def merge(self, state):
+        values, histograms = state
+        with self._lock:
+            for key, value in values.items():
+                if METRIC_DEFINITIONS[key[0]][0] == 'gauge':
+                    self._values[key] = value
+                else:
+                    self._values[key] = self._values.get(key, 0) + value
+            for key, counts in histograms.items():
+                hist = self._histograms.get(key)
+                if hist is None:
+                    self._histograms[key] = list(counts)
+                else:
+                    for i, count in enumerate(counts):
+                        hist[i] += count
+
+    def to_prometheus(self):
+        """Prometheus text exposition format."""
+        with self._lock:
+            values = dict(self._values)
+            histograms = {key: list(hist) for key, hist in self._histograms.items()}
+        lines = []
+        for name, (kind, help_text, buckets) in METRIC_DEFINITIONS.items():
+            series = sorted(key for key in (histograms if buckets else values) if key[0] == name)
+            if not series:
+                continue
+            lines.append('# HELP {} {}'.format(name, help_text))
+            lines.append('# TYPE {} {}'.format(name, kind))
+            for key in series:
+                labels = key[1]
+                if not buckets:
+                    lines.append('{}{} {}'.format(name, _prometheus_labels(labels), _prometheus_number(values[key])))
+                    continue
+                hist = histograms[key]
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), hist):
+                    cumulative += count
+                    lines.append('{}_bucket{} {}'.format(
+                        name, _prometheus_labels(labels + (('le', bound),)), cumulative))
+                lines.append('{}_sum{} {}'.format(name, _prometheus_labels(labels), _prometheus_number(hist[-1])))
+                lines.append('{}_count{} {}'.format(name, _prometheus_labels(labels), cumulative))
+        return '\n'.join(lines) + '\n'
+
+    def to_dict(self):
+        """JSON-friendly view: {name: [{labels, value} or {labels, buckets, sum, count}]}."""
+        with self._lock:
+            values = dict(self._values)
+            histograms = {key: list(hist) for key, hist in self._histograms.items()}
+        report = {}
+        for (name, labels), value in sorted(values.items()):
+            report.setdefault(name, []).append({'labels': dict(labels), 'value': value})
+        for (name, labels), hist in sorted(histograms.items()):
+            buckets = METRIC_DEFINITIONS[name][2]
+            report.setdefault(name, []).append({
+                'labels': dict(labels),
+                'buckets': {str(bound): count for bound, count in zip(buckets + ('+Inf',), hist)},
+                'sum': round(hist[-1], 6),
+                'count': sum(hist[:-1]),
+            })
+        return report
+
+
+def _prometheus_labels(labels):
+    if not labels:
+        return ''
+    return '{{{}}}'.format(','.join(
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in labels))
+
+
+def _prometheus_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+METRICS = Metrics()
+
+
+def record_result(result, neg_score, pos_score, metrics=METRICS):
+    """Count a scored conversation and its score distributions."""
+    metrics.inc('voc_records_processed_total', sentiment=result.sentiment)
+    metrics.observe('voc_neg_score', neg_score)
+    metrics.observe('voc_pos_score', pos_score)
+    metrics.observe('voc_confidence', result.confidence)
+
+
+def record_cache_lookups(cache, metrics=METRICS):
+    """Count the lookups of a ResultCache since the last call."""
+    metrics.inc('voc_cache_lookups_total', cache.hits, result='hit')
+    metrics.inc('voc_cache_lookups_total', cache.partial_hits, result='partial')
+    metrics.inc('voc_cache_lookups_total', cache.misses, result='miss')
+    cache.hits = cache.partial_hits = cache.misses = 0
+
+
+def write_metrics(path, metrics=METRICS):
+    """Atomically write the Prometheus text file (node_exporter textfile collector)."""
+    tmp = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(metrics.to_prometheus())
+    os.replace(tmp, path)
+
+
+def write_run_report(path, run, metrics=METRICS):
+    """Atomically write the JSON run report: run information plus all metrics."""
+    tmp = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(dict(run, metrics=metrics.to_dict()), f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+# ─── Scoring Stage ──────────────────────────────────────────────────────────
+
+def analyze_conversation(summary, transcripts, cached=None, budget=None, metrics=METRICS):
+    """Score one conversation. Returns (ConversationResult, neg_score, pos_score).
+
+    transcripts is a tuple of transcripts by speaker (see
+    speaker_transcripts); the texts are segmented once for all components.
+    Components present in ``cached`` (see ResultCache.get) are reused as is.
+    The latency of each scoring function called is observed in ``metrics``
+    (None to skip).
+    """
+    cached = cached or {}
+    clock = time.perf_counter
+    timings = []
+    if len(cached) < len(LEXICON_FINGERPRINTS):
+        start = clock()
+        text = SegmentedConversation(summary, transcripts, budget)
+        timings.append(('segment_conversation', clock() - start))
+    if 'sentiment' in cached:
+        sentiment, confidence, neg_score, pos_score, speakers, trajectory = cached['sentiment']
+    else:
+        start = clock()
+        neg_score, pos_score, neutral_hits, speakers, trajectory = sentiment_scores(text)
+        sentiment, confidence = classify_sentiment(neg_score, pos_score, neutral_hits)
+        timings.append(('analyze_sentiment', clock() - start))
+    if 'themes' in cached:
+        themes = cached['themes']
+    else:
+        start = clock()
+        themes = conversation_themes(text)
+        timings.append(('extract_themes', clock() - start))
+    if 'keywords' in cached:
+        keywords = cached['keywords']
+    else:
+        start = clock()
+        keywords = conversation_keywords(text)
+        timings.append(('extract_keywords', clock() - start))
+    if metrics is not None:
+        for function, seconds in timings:
+            metrics.observe('voc_function_seconds', seconds, function=function)
+    result = ConversationResult(sentiment, confidence, themes, keywords, speakers, trajectory)
+    return result, neg_score, pos_score
+
+
+def _analyze_items(items):
+    """Score a list of (summary, transcripts, cached, budget) items."""
+    return [analyze_conversation(*item) for item in items]
+
+
+def _init_worker():
+    """Scoring process initializer: a forked worker inherits the parent's
+    METRICS; clear them so _analyze_chunk() only returns its own."""
+    METRICS.drain()
+
+
+def _analyze_chunk(chunk):
+    """Worker process entry point: the outputs of _analyze_items() and the
+    worker's metrics for them."""
+    return _analyze_items(chunk), METRICS.drain()
+
+
+def _chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ─── Deduplication ───────────────────────────────────────────────────────────
+
+DEDUP_MODES = ('exact', 'near')
+SHINGLE_WORDS = 3                  # summaries are compared as sets of word 3-grams
+MINHASH_BINS = 32                  # one-permutation MinHash signature length
+LSH_BANDS = 8                      # summaries sharing one band of the signature are compared
+NEAR_DUPLICATE_SIMILARITY = 0.8    # minimum estimated Jaccard similarity of near-duplicates
+NEAR_DUPLICATE_MIN_SHINGLES = 5    # shorter summaries are only matched exactly
+_WORD_RE = re.compile(r'\w+')
+_EMPTY_BIN = 0xFFFFFFFF
+
+
+def shingles(summary):
+    """Set of word SHINGLE_WORDS-grams of a normalized summary."""
+    words = _WORD_RE.findall(normalize_text(summary))
+    return {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def minhash(items):
+    """One-permutation MinHash signature (array of MINHASH_BINS values) of a
+    non-empty set of strings.
+
+    Each string is hashed once (crc32): the hash picks a bin and the
+    smallest remaining value is kept per bin. An empty bin borrows the value
+    of the next non-empty one (rotation densification), so every bin of two
+    signatures can be compared: the share of equal bins estimates the
+    Jaccard similarity of the sets.
+    """
+    signature = array('I', [_EMPTY_BIN]) * MINHASH_BINS
+    for item in items:
+        h = zlib.crc32(item.encode('utf-8'))
+        b = h % MINHASH_BINS
+        value = h // MINHASH_BINS
+        if value < signature[b]:
+            signature[b] = value
+    empty = [b for b in range(MINHASH_BINS) if signature[b] == _EMPTY_BIN]
+    if empty:
+        source = signature.tolist()
+        for b in empty:
+            distance = 1
+            while source[(b + distance) % MINHASH_BINS] == _EMPTY_BIN:
+                distance += 1
+            # Offset by the distance so borrowed values don't collide with real ones
+            signature[b] = source[(b + distance) % MINHASH_BINS] + distance * (_EMPTY_BIN // MINHASH_BINS + 1)
+    return signature
+
+
+class Deduplicator:
+    """Detect conversations already seen: exact duplicates (same summary and
+    transcripts) and, in 'near' mode, near-duplicates (summaries whose
+    MinHash-estimated Jaccard similarity is at least NEAR_DUPLICATE_SIMILARITY,
+    found through LSH banding of the signatures).
+
+    check() is called in input order. A duplicate reuses the scores of the
+    first occurrence; with count_duplicates it is also counted in the
+    dashboard files, otherwise it is dropped. Memory per distinct
+    conversation: a content key, one signature and LSH_BANDS index entries.
+    """
+
+    def __init__(self, mode='exact', count_duplicates=False):
+        self.mode = mode
+        self.count_duplicates = count_duplicates
+        self.positions = 0
+        self.counts = {'exact': 0, 'near': 0}
+        self.outputs = {}          # representative position -> analyze_conversation() output
+        self._exact = {}           # content key -> representative position
+        self._bands = {}           # (band, band values) hash -> signature slot
+        self._signatures = array('I')
+        self._slot_positions = []  # signature slot -> representative position
+
+    def check(self, summary, transcripts):
+        """Return (position, representative position) of a conversation; the
+        representative is None unless it duplicates an earlier one."""
+        position = self.positions
+        self.positions += 1
+        key = ResultCache.content_key(summary, transcripts)
+        original = self._exact.get(key)
+        if original is not None:
+            return self._duplicate(position, original, 'exact')
+        if self.mode != 'near':
+            self._exact[key] = position
+            return position, None
+
+        items = shingles(summary)
+        if len(items) < NEAR_DUPLICATE_MIN_SHINGLES:
+            self._exact[key] = position
+            return position, None
+        signature = minhash(items)
+        rows = MINHASH_BINS // LSH_BANDS
+        bands = [hash((band, tuple(signature[band * rows:(band + 1) * rows]))) for band in range(LSH_BANDS)]
+        for band_key in bands:
+            slot = self._bands.get(band_key)
+            if slot is not None and self._similarity(signature, slot) >= NEAR_DUPLICATE_SIMILARITY:
+                original = self._exact[key] = self._slot_positions[slot]
+                return self._duplicate(position, original, 'near')
+
+        self._exact[key] = position
+        slot = len(self._slot_positions)
+        self._slot_positions.append(position)
+        self._signatures.extend(signature)
+        for band_key in bands:
+            self._bands.setdefault(band_key, slot)
+        return position, None
+
+    def forget(self, position):
+        """Drop what was learned from the conversations at position and after
+        (a batch that could not be completed)."""
+        self.positions = position
+        self._exact = {key: p for key, p in self._exact.items() if p < position}
+        self.outputs = {p: output for p, output in self.outputs.items() if p < position}
+        slots = sum(p < position for p in self._slot_positions)
+        del self._slot_positions[slots:]
+        del self._signatures[slots * MINHASH_BINS:]
+        self._bands = {key: slot for key, slot in self._bands.items() if slot < slots}
+
+    def _similarity(self, signature, slot):
+        other = self._signatures[slot * MINHASH_BINS:(slot + 1) * MINHASH_BINS]
+        return sum(a == b for a, b in zip(signature, other)) / MINHASH_BINS
+
+    def _duplicate(self, position, original, kind):
+        self.counts[kind] += 1
+        METRICS.inc('voc_duplicates_total', kind=kind)
+        return position, original
+
+
+# ─── Scoring Pipeline ────────────────────────────────────────────────────────
+
+PIPELINE_DEPTH = 2  # chunks queued between two pipeline stages, per scoring worker
+
+
+def run_pipeline(records, sink, workers=1, chunk_size=64, cache=None, budget=None, dedup=None):
+    """Score (summary, transcripts, payload) records and call
+    sink(payload, result, neg_score, pos_score) for each one, in input order.
+
+    The stages run concurrently under asyncio and are connected by bounded
+    queues, so a slow stage holds back the ones before it:
+    - reader: pulls chunks of records (parsing the input) in a thread and,
+      with a Deduplicator, marks the duplicates of earlier records;
+    - scorers: ``workers`` tasks, each scoring one chunk at a time in a
+      process pool (a thread when workers == 1);
+    - aggregator: restores input order, stores new results in the cache and
+      feeds the sink. Duplicates get the output of their first occurrence,
+      or are left out unless the Deduplicator counts them.
+    At most PIPELINE_DEPTH chunks per worker wait between two stages, so
+    memory does not grow with the input. With a ResultCache, cached
+    components are reused; results of transcripts cut by a TranscriptBudget
+    are not stored. Duplicates are neither looked up nor scored.
+    """
+    asyncio.run(_run_pipeline(records, sink, workers, chunk_size, cache, budget, dedup))
+
+
+async def _run_pipeline(records, sink, workers, chunk_size, cache, budget, dedup):
+    loop = asyncio.get_running_loop()
+    to_score = asyncio.Queue(workers * PIPELINE_DEPTH)
+    scored = asyncio.Queue(workers * PIPELINE_DEPTH)
+
+    async def reader(pool):
+        chunks = _chunked(records, chunk_size)
+        seq = 0
+        while True:
+            chunk = await loop.run_in_executor(pool, next, chunks, None)
+            if chunk is None:
+                break
+            # (position, representative position) per record
+            duplicates = [dedup.check(summary, transcripts) for summary, transcripts, _ in chunk] if dedup else None
+            await to_score.put((seq, chunk, duplicates))
+            seq += 1
+        for _ in range(workers):
+            await to_score.put(None)
+
+    async def scorer(pool):
+        while True:
+            task = await to_score.get()
+            if task is None:
+                await scored.put(None)
+                return
+            seq, chunk, duplicates = task
+            items, keys = [], []
+            for j, (summary, transcripts, _) in enumerate(chunk):
+                if duplicates and duplicates[j][1] is not None:
+                    continue
+                if cache is None:
+                    items.append((summary, transcripts, None, budget))
+                    continue
+                key = cache.content_key(summary, transcripts)
+                cached = cache.get(key)
+                complete = len(cached) == len(LEXICON_FINGERPRINTS)
+                cut = budget is not None and any(len(t) > budget.chars for t in transcripts)
+                keys.append(None if complete or cut else key)
+                # A complete hit never reads the texts; don't ship them to a worker
+                items.append((summary, (), cached, None) if complete else (summary, transcripts, cached, budget))
+            if pool is in_process:
+                outputs = await loop.run_in_executor(pool, _analyze_items, items)
+            else:
+                outputs, metrics = await loop.run_in_executor(pool, _analyze_chunk, items)
+                METRICS.merge(metrics)
+            await scored.put((seq, chunk, duplicates, outputs, keys))
+
+    async def aggregator():
+        waiting = {}  # seq -> scored chunk that arrived before its predecessors
+        next_seq = 0
+        running = workers
+        while running:
+            task = await scored.get()
+            if task is None:
+                running -= 1
+                continue
+            waiting[task[0]] = task
+            while next_seq in waiting:
+                _, chunk, duplicates, outputs, keys = waiting.pop(next_seq)
+                for key, output in zip(keys, outputs):
+                    if key is not None:
+                        cache.put(key, *output)
+                outputs = iter(outputs)
+                for j, (_, _, payload) in enumerate(chunk):
+                    if duplicates is None:
+                        sink(payload, *next(outputs))
+                        continue
+                    position, original = duplicates[j]
+                    if original is None:
+                        output = next(outputs)
+                        if dedup.count_duplicates:
+                            dedup.outputs[position] = output
+                    elif dedup.count_duplicates:
+                        output = dedup.outputs[original]
+                    else:
+                        continue
+                    sink(payload, *output)
+                next_seq += 1
+
+    with ThreadPoolExecutor(1) as read_pool, ThreadPoolExecutor(1) as in_process:
+        score_pool = ProcessPoolExecutor(workers, initializer=_init_worker) if workers > 1 else in_process
+        try:
+            await asyncio.gather(reader(read_pool), aggregator(),
+                                 *(scorer(score_pool) for _ in range(workers)))
+        finally:
+            if score_pool is not in_process:
+                score_pool.shutdown(cancel_futures=True)
+
+
+def compact_record(conv):
+    """(summary, transcripts, ConversationRecord) of a conversation record; only
+    the ConversationRecord stays in memory once it is scored."""
+    return (conv.get('summary', '') or '', speaker_transcripts(conv),
+            ConversationRecord.from_conversation(conv))
+
+
+def score_records(records, args, cache=None, budget=None, store=None, first_position=0, dedup=None):
+    """Score conversation records through run_pipeline, folding each result into
+    new DashboardAggregates (and the ResultStoreWriter, if any) as it arrives.
+
+    Returns (conversations, results, aggregates). Positions, used for the
+    debug log, start at first_position.
+    """
+    conversations = []
+    results = []
+    aggregates = DashboardAggregates()
+    verbose = args.log_level == 'debug'
+
+    def add(conv, result, neg_score, pos_score):
+        i = first_position + len(results)
+        aggregates.add(result, conv.audio_duration, conv.date)
+        record_result(result, neg_score, pos_score)
+        if store:
+            store.add(conv, result, neg_score, pos_score)
+        # The result store has the full summary; the page files need only the start
+        conv.summary = conv.summary[:PAGE_SUMMARY_CHARS]
+        conversations.append(conv)
+        results.append(result)
+
+        if verbose:
+            print("  [{:>3}] {} (conf:{}) neg={} pos={} themes={}".format(
+                i, result.sentiment.upper().ljust(8), result.confidence,
+                neg_score, pos_score, list(result.themes[:2])))
+
+    run_pipeline((compact_record(conv) for conv in records), add,
+                 args.workers, args.chunk_size, cache, budget, dedup)
+    return conversations, results, aggregates
+
+
+# ─── Watch Mode ──────────────────────────────────────────────────────────────
+
+WATCH_SUFFIXES = ('.json', '.jsonl', '.ndjson')
+WATCH_INTERVAL = 2.0            # seconds between two scans of the drop directory
+WATCH_DEBOUNCE = 5.0            # a file is ingested once unchanged for this many seconds
+WATCH_STATE_DIR = '.voc-state'  # inside the drop directory
+
+
+class WatchState:
+    """Everything a --watch daemon has ingested, persisted in WATCH_STATE_DIR.
+
+    state.json records, per input file, its size, mtime and how many of its
+    records were ingested (files are expected to be new batches or to only
+    grow, e.g. a JSON Lines file being appended to), plus the lexicon
+    fingerprints and the DashboardAggregates.to_dict() of all records. The
+    per-conversation results needed for the page files are kept in one
+    result store segment per ingested batch. A segment is written before
+    state.json is atomically replaced, so a batch interrupted half-way is
+    ingested again on restart.
+    """
+
+    def __init__(self, drop_dir):
+        self.dir = os.path.join(drop_dir, WATCH_STATE_DIR)
+        self.files = {}     # file name -> {'size', 'mtime_ns', 'records'}
+        self.segments = []  # segment file names, in ingestion order
+        self.aggregates = DashboardAggregates()
+        self.conversations = []
+        self.results = []
+        path = os.path.join(self.dir, 'state.json')
+        if not os.path.exists(path):
+            return
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+        if state['fingerprints'] != LEXICON_FINGERPRINTS:
+            print("  Warning: {} was scored with another lexicon; remove it to re-score".format(self.dir))
+        self.files = state['files']
+        self.segments = state['segments']
+        self.aggregates = DashboardAggregates.from_dict(state['aggregates'])
+        for segment in self.segments:
+            conversations, results = load_store_results(os.path.join(self.dir, segment))
+            self.conversations.extend(conversations)
+            self.results.extend(results)
+
+    def pending(self, drop_dir, failed, now):
+        """[(name, stat)] of the input files with records not ingested yet,
+        once they have been left unchanged for WATCH_DEBOUNCE seconds."""
+        ready = []
+        for entry in sorted(os.scandir(drop_dir), key=lambda e: e.name):
+            if not entry.is_file() or not entry.name.endswith(WATCH_SUFFIXES):
+                continue
+            stat = entry.stat()
+            version = stat.st_size, stat.st_mtime_ns
+            seen = self.files.get(entry.name)
+            if (seen and (seen['size'], seen['mtime_ns']) == version) or failed.get(entry.name) == version:
+                continue
+            if now - stat.st_mtime >= WATCH_DEBOUNCE:
+                ready.append((entry.name, stat))
+        return ready
+
+    def ingest(self, drop_dir, name, stat, args, cache=None, budget=None, dedup=None):
+        """Score the records of a file not ingested yet. Returns their number."""
+        skip = self.files.get(name, {}).get('records', 0)
+        segment = 'segment-{:05d}.vocr'.format(len(self.segments))
+        store = ResultStoreWriter(os.path.join(self.dir, segment), len(self.results))
+        records = islice(iter_conversations(os.path.join(drop_dir, name)), skip, None)
+        conversations, results, aggregates = score_records(records, args, cache, budget, store,
+                                                           len(self.results), dedup)
+        self.files[name] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                            'records': skip + len(results)}
+        if results:
+            store.close()
+            self.segments.append(segment)
+            self.conversations.extend(conversations)
+            self.results.extend(results)
+            self.aggregates.merge(aggregates)
+        self.save()
+        return len(results)
+
+    def save(self):
+        path = os.path.join(self.dir, 'state.json')
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({
+                'fingerprints': LEXICON_FINGERPRINTS,
+                'files': self.files,
+                'segments': self.segments,
+                'aggregates': self.aggregates.to_dict(),
+            }, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, path)
+
+
+def watch(drop_dir, args, cache=None, budget=None):
+    """Ingest new conversation files from drop_dir until interrupted.
+
+    Every WATCH_INTERVAL seconds, the records not ingested yet of the files
+    that have settled are scored and folded into the persisted aggregates,
+    then a new output generation is published. Files whose content is
+    unchanged are linked from the previous generation rather than rewritten.
+    With --dedup, duplicates are detected across the batches ingested since
+    the daemon started.
+    """
+    state = WatchState(drop_dir)
+    os.makedirs(state.dir, exist_ok=True)
+    dedup = Deduplicator(args.dedup, args.count_duplicates) if args.dedup else None
+    failed = {}  # file name -> (size, mtime_ns) of a version that could not be read
+    print("\n  Watching {} ({} conversations already ingested)".format(drop_dir, len(state.results)))
+    while True:
+        run = new_run(drop_dir)
+        start = time.perf_counter()
+        ingested = 0
+        for name, stat in state.pending(drop_dir, failed, time.time()):
+            mark = dedup.positions if dedup else 0
+            try:
+                count = state.ingest(drop_dir, name, stat, args, cache, budget, dedup)
+            except (OSError, ValueError) as e:  # includes json.JSONDecodeError
+                if dedup:
+                    dedup.forget(mark)
+                failed[name] = stat.st_size, stat.st_mtime_ns
+                print("  Skipping {}: {}".format(name, e))
+                continue
+            print("  Ingested {} new conversations from {}".format(count, name))
+            ingested += count
+        if ingested:
+            if cache:
+                cache.commit()
+                record_cache_lookups(cache)
+            pipeline_time = time.perf_counter() - start
+            run['stages']['pipeline'] = pipeline_time
+            METRICS.set('voc_records_per_second', round(ingested / pipeline_time, 1))
+            finish_run(args, run, state.conversations, state.results, state.aggregates)
+        time.sleep(WATCH_INTERVAL)
 
 
 # ─── Main ────────────────────────────────────────────────────────────────────
 
 def main():
+    parser = argparse.ArgumentParser(description='DPD VOC sentiment analysis pipeline')
+    parser.add_argument('--input', default=INPUT_FILE,
+                        help='conversations export (JSON array or JSON Lines)')
+    parser.add_argument('--limit', type=int, default=MAX_CONVERSATIONS,
+                        help='maximum number of conversations to analyze')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of scoring processes (1 = score in a thread of this process)')
+    parser.add_argument('--chunk-size', type=int, default=64,
+                        help='conversations per work unit sent to a scoring process')
+    parser.add_argument('--cache', metavar='FILE',
+                        help='SQLite result cache; unchanged conversations are not re-scored')
+    parser.add_argument('--transcript-budget', type=int, metavar='CHARS',
+                        help='scan at most about CHARS characters of each transcript (opening, '
+                             'closing and sampled middle segments) and report the difference '
+                             'with a full scan on a sample')
+    parser.add_argument('--msgpack', action='store_true',
+                        help='also write a MessagePack variant of every output file')
+    parser.add_argument('--rebuild-lexicon', action='store_true',
+                        help='recompile the lexicon matcher artifact from {} and exit'.format(
+                            os.path.relpath(LEXICON_FILE, PROJECT_ROOT)))
+    parser.add_argument('--results', metavar='FILE',
+                        help='also write the per-conversation results to a columnar file '
+                             '(Parquet if FILE ends with .parquet)')
+    parser.add_argument('--from-results', metavar='FILE',
+                        help='regenerate the dashboard files from a --results file without re-scoring')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='write run metrics in Prometheus text format (e.g. for the node_exporter '
+                             'textfile collector)')
+    parser.add_argument('--run-report', metavar='FILE',
+                        help='write a JSON run report: run information, stage timings and all metrics')
+    parser.add_argument('--log-level', choices=LOG_LEVELS, default='info',
+                        help='debug prints one line per scored conversation')
+    parser.add_argument('--dedup', choices=DEDUP_MODES,
+                        help='skip scoring duplicate conversations: exact (same summary and transcripts) '
+                             'or near (also summaries that are near-duplicates, by MinHash/LSH)')
+    parser.add_argument('--count-duplicates', action='store_true',
+                        help='with --dedup, still count duplicates in the dashboard files '
+                             '(with the scores of their first occurrence)')
+    parser.add_argument('--watch', metavar='DIR',
+                        help='keep running: ingest new JSON/JSON Lines files dropped in DIR and '
+                             'refresh the dashboard files (state is kept in DIR/{})'.format(WATCH_STATE_DIR))
+    args = parser.parse_args()
+    try:
+        budget = TranscriptBudget(args.transcript_budget) if args.transcript_budget else None
+    except ValueError as e:
+        parser.error(str(e))
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.chunk_size < 1:
+        parser.error('--chunk-size must be at least 1')
+    if args.msgpack and msgpack is None:
+        parser.error('--msgpack requires the msgpack package')
+    if args.count_duplicates and not args.dedup:
+        parser.error('--count-duplicates requires --dedup')
+    if args.watch and (args.results or args.from_results):
+        parser.error('--watch keeps its own results; it cannot be combined with --results or --from-results')
+    if args.watch and not os.path.isdir(args.watch):
+        parser.error('--watch: {} is not a directory'.format(args.watch))
+    for path in (args.results, args.from_results):
+        if path and path.endswith('.parquet'):
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                parser.error('.parquet result files require the pyarrow package')
+
+    if args.rebuild_lexicon:
+        load_phrase_matcher(rebuild=True)
+        print("  Lexicon v{} ({}) compiled to {}".format(LEXICON_VERSION, LEXICON_HASH, phrase_matcher_path()))
+        return
+
     print("=" * 60)
     print("  DPD VOC - Sentiment Analysis Pipeline")
-    print("  (Deterministic - first {} conversations)".format(MAX_CONVERSATIONS))
+    if not args.watch:
+        print("  (Deterministic - first {} conversations)".format(args.limit))
+    print("  Lexicon v{} ({})".format(LEXICON_VERSION, LEXICON_HASH))
     print("=" * 60)
 
-    # Load data
-    print("\n--- Loading Data ---")
-    with open(INPUT_FILE, 'r', encoding='utf-8') as f:
-        all_convs = json.load(f)
-    conversations = all_convs[:MAX_CONVERSATIONS]
-    print("  Loaded {} conversations (from {} total)".format(len(conversations), len(all_convs)))
-
-    # Analyze each conversation (using both summary + transcript)
+    run = new_run(args.from_results or args.watch or args.input)
+    cache = ResultCache(args.cache) if args.cache else None
+
+    if args.watch:
+        try:
+            watch(args.watch, args, cache, budget)
+        except KeyboardInterrupt:
+            print("\n  Stopped watching {}".format(args.watch))
+        finally:
+            if cache:
+                cache.close()
+        return
+
+    if args.from_results:
+        print("\n  Reading results from {}".format(args.from_results))
+        start = time.perf_counter()
+        conversations, results = load_store_results(args.from_results)
+        run['stages']['load'] = time.perf_counter() - start
+        finish_run(args, run, conversations, results)
+        return
+
+    # Stream records through the scoring pipeline (using the summary and every
+    # speaker's transcript); the dashboard aggregates are updated as results
+    # arrive and only the fields needed by the page files are kept once a
+    # record is scored.
     print("\n--- Analyzing Sentiments & Themes (summary + transcript) ---")
-    results = []
-    for i, conv in enumerate(conversations):
-        summary = conv.get('summary', '') or ''
-        transcript = conv.get('transcript_speaker_1', '') or ''
-        sentiment, confidence, neg_score, pos_score = analyze_sentiment(summary, transcript)
-        themes = extract_themes(summary)
-        keywords = extract_keywords(summary, transcript)
-
-        results.append({
-            'sentiment': sentiment,
-            'confidence': confidence,
-            'themes': themes,
-            'keywords': keywords,
-        })
-
-        if i < 10 or i % 50 == 0:
-            print("  [{:>3}] {} (conf:{}) neg={} pos={} themes={}".format(
-                i, sentiment.upper().ljust(8), confidence, neg_score, pos_score, themes[:2]))
+    print("  Reading {}".format(args.input))
+    if args.workers > 1:
+        print("  Scoring with {} worker processes".format(args.workers))
+    if budget:
+        print("  Transcript budget: {} characters".format(budget.chars))
+    budget_samples = []
+
+    def records():
+        for conv in iter_conversations(args.input, args.limit):
+            if budget and len(budget_samples) < BUDGET_REPORT_SAMPLE:
+                transcripts = speaker_transcripts(conv)
+                if any(len(t) > budget.chars for t in transcripts):
+                    budget_samples.append((conv.get('summary', '') or '', transcripts))
+            yield conv
+
+    store = ResultStoreWriter(args.results) if args.results else None
+    dedup = Deduplicator(args.dedup, args.count_duplicates) if args.dedup else None
+    start = time.perf_counter()
+    conversations, results, aggregates = score_records(records(), args, cache, budget, store, dedup=dedup)
+    pipeline_time = time.perf_counter() - start
+    run['stages']['pipeline'] = pipeline_time
+    METRICS.set('voc_records_per_second', round(len(results) / pipeline_time, 1) if pipeline_time else 0)
+
+    if cache:
+        cache.close()
+        print("\n  Cache {}: {} hits, {} partial, {} misses".format(
+            cache.path, cache.hits, cache.partial_hits, cache.misses))
+        record_cache_lookups(cache)
+    if dedup:
+        run['duplicates'] = dict(dedup.counts, counted=dedup.count_duplicates)
+        print("\n  Duplicates: {} exact, {} near ({})".format(
+            dedup.counts['exact'], dedup.counts['near'],
+            'counted with the scores of their first occurrence' if dedup.count_duplicates else 'not counted'))
+    if budget:
+        budget_report(budget_samples, budget)
+    if store:
+        store.close()
+        print("\n  Results written to {} ({} rows)".format(store.path, store.rows))
 
     # Summary of sentiments
-    sc = Counter(r['sentiment'] for r in results)
-    print("\n  Analysis complete:")
+    sc = Counter(r.sentiment for r in results)
+    print("\n  Analysis complete ({} conversations):".format(len(results)))
     print("    Positive: {}  Neutral: {}  Negative: {}".format(
         sc.get('positive', 0), sc.get('neutral', 0), sc.get('negative', 0)))
 
     # Generate dashboard files
     print("\n--- Generating Dashboard Files ---")
-    generate_dashboard_files(conversations, results)
+    finish_run(args, run, conversations, results, aggregates)
+
+
+def new_run(source):
+    """Run information for the --run-report file of a run reading source."""
+    METRICS.set('voc_lexicon_info', 1, version=LEXICON_VERSION, hash=LEXICON_HASH)
+    return {
+        'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'input': source,
+        'lexicon': {'version': LEXICON_VERSION, 'hash': LEXICON_HASH},
+        'analyzer_version': ANALYZER_VERSION,
+        'stages': {},
+    }
+
+
+def finish_run(args, run, conversations, results, aggregates=None):
+    """Generate the dashboard files, then write the --metrics and --run-report files."""
+    start = time.perf_counter()
+    entries = generate_dashboard_files(conversations, results, args.msgpack, aggregates)
+    run['stages']['dashboard'] = time.perf_counter() - start
+
+    sentiments = Counter(r.sentiment for r in results)
+    for sentiment in SENTIMENTS:
+        METRICS.set('voc_sentiment_ratio', round(sentiments[sentiment] / len(results), 4) if results else 0,
+                    sentiment=sentiment)
+    for stage, seconds in run['stages'].items():
+        METRICS.set('voc_stage_seconds', round(seconds, 3), stage=stage)
+    METRICS.set('voc_last_run_timestamp_seconds', int(time.time()))
+
+    run.update(
+        finished_at=datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        records=len(results),
+        sentiments={sentiment: sentiments[sentiment] for sentiment in SENTIMENTS},
+        stages={stage: round(seconds, 3) for stage, seconds in run['stages'].items()},
+        files=entries,
+    )
+    if args.metrics:
+        write_metrics(args.metrics)
+        print("  Metrics written to {}".format(args.metrics))
+    if args.run_report:
+        write_run_report(args.run_report, run)
+        print("  Run report written to {}".format(args.run_report))
 
 
 if __name__ == '__main__':
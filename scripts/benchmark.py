@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+DPD VOC Sentiment Analysis - Benchmarks
+Times the analysis pipeline stage by stage, on synthetic French
+conversations or on a real conversations export.
+
+Usage:
+    python scripts/benchmark.py pipeline [--conversations N] [--transcript-words N]
+                                         [--input FILE] [--profile FILE]
+    python scripts/benchmark.py normalize [--input FILE] [--limit N]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import analyze_conversations as ac
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# ─── Synthetic Conversations ─────────────────────────────────────────────────
+
+FILLER_WORDS = (
+    "bonjour le client appelle pour son colis qui devait être livré hier "
+    "mais il n'a rien reçu à son domicile l'agent vérifie le numéro de suivi "
+    "dans le système et confirme que la livraison est prévue demain matin "
+    "entre neuf heures et midi la cliente précise qu'elle sera présente "
+    "le livreur déposera le colis au point relais si personne ne répond "
+    "oui d'accord je vous écoute alors voilà je comprends très bien euh "
+    "donc en fait c'est pour savoir où en est ma commande passée la semaine dernière"
+).split()
+
+TRANSCRIPT_PHRASES = (
+    list(ac.TRANSCRIPT_NEGATIVE_INDICATORS) + list(ac.TRANSCRIPT_POSITIVE_INDICATORS)
+    + ['merci', "d'accord", 'au revoir', 'ok']
+)
+
+SUMMARY_PHRASES = (
+    list(ac.NEGATIVE_INDICATORS) + list(ac.POSITIVE_INDICATORS) + list(ac.NEUTRAL_INDICATORS)
+    + [kw for keywords in ac.THEME_PATTERNS.values() for kw in keywords]
+    + list(ac.KEYWORD_CANDIDATES)
+)
+
+
+def _sentence(rng, words, phrases, phrase_rate):
+    out = []
+    for _ in range(words):
+        out.append(rng.choice(phrases) if rng.random() < phrase_rate else rng.choice(FILLER_WORDS))
+    return ' '.join(out)
+
+
+def generate_conversations(count, transcript_words=600, summary_words=60, seed=42):
+    """Build synthetic French conversations shaped like the export records."""
+    rng = random.Random(seed)
+    conversations = []
+    for _ in range(count):
+        summary = _sentence(rng, rng.randint(summary_words // 2, summary_words), SUMMARY_PHRASES, 0.15)
+        transcript = _sentence(rng, rng.randint(transcript_words // 2, transcript_words),
+                               TRANSCRIPT_PHRASES, 0.05)
+        agent_transcript = _sentence(rng, rng.randint(transcript_words // 4, transcript_words // 2),
+                                     TRANSCRIPT_PHRASES, 0.05)
+        conversations.append({
+            'summary': summary[0].upper() + summary[1:],
+            'transcript_speaker_1': transcript + ' !' * rng.randint(0, 6),
+            'transcript_speaker_2': agent_transcript,
+            'audio_duration': round(rng.uniform(20, 900), 1),
+        })
+    return conversations
+
+
+# ─── Measurements ───────────────────────────────────────────────────────────
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def report_stage(name, latencies, count=None):
+    """Print total time, throughput and latency percentiles for one stage."""
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    count = len(ordered) if count is None else count
+    rate = count / total if total else 0
+    print("  {:<24} {:9.1f} ms {:10.0f}/s   p50 {:8.3f}  p95 {:8.3f}  p99 {:8.3f}  max {:8.3f} ms".format(
+        name, total * 1000, rate,
+        percentile(ordered, 50) * 1000, percentile(ordered, 95) * 1000,
+        percentile(ordered, 99) * 1000, (ordered[-1] if ordered else 0) * 1000))
+
+
+@contextlib.contextmanager
+def profiled(path, profiler):
+    """Profile the enclosed block and dump the result to path (no-op if path is None)."""
+    if not path:
+        yield
+        return
+    if profiler == 'pyinstrument':
+        from pyinstrument import Profiler
+        prof = Profiler()
+        prof.start()
+        try:
+            yield
+        finally:
+            prof.stop()
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(prof.output_html() if path.endswith('.html') else prof.output_text())
+    else:
+        import cProfile
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            prof.dump_stats(path)
+    print("  Profile written to {}".format(path))
+
+
+# ─── Pipeline Benchmark ──────────────────────────────────────────────────────
+
+def bench_pipeline(input_path, limit, profile=None, profiler='cprofile'):
+    """Time each pipeline stage over the conversations in input_path."""
+    # Load
+    start = time.perf_counter()
+    records = list(ac.iter_conversations(input_path, limit))
+    load_time = time.perf_counter() - start
+    texts = [(conv.get('summary', '') or '', ac.speaker_transcripts(conv)) for conv in records]
+    conversations = [ac.ConversationRecord.from_conversation(conv) for conv in records]
+    chars = sum(len(s) + sum(map(len, ts)) for s, ts in texts)
+    print("  Corpus: {} conversations, {:.1f} MB of text".format(len(texts), chars / 1e6))
+    del records
+    print()
+    report_stage('load', [load_time], count=len(texts))
+
+    # Scoring functions in isolation: each call segments and scans the texts
+    # itself, analyze_conversation() does it once for all three
+    stages = (
+        ('segment_conversation', lambda s, t: ac.SegmentedConversation(s, t)),
+        ('analyze_sentiment', lambda s, t: ac.analyze_sentiment(s, t)),
+        ('extract_themes', lambda s, t: ac.extract_themes(s)),
+        ('extract_keywords', lambda s, t: ac.extract_keywords(s, t)),
+    )
+    for name, func in stages:
+        latencies = []
+        for summary, transcript in texts:
+            start = time.perf_counter()
+            func(summary, transcript)
+            latencies.append(time.perf_counter() - start)
+        report_stage(name, latencies)
+
+    # End to end scoring, as run by main()
+    latencies = []
+    results = []
+    with profiled(profile, profiler):
+        for summary, transcript in texts:
+            start = time.perf_counter()
+            result, _, _ = ac.analyze_conversation(summary, transcript)
+            latencies.append(time.perf_counter() - start)
+            results.append(result)
+    report_stage('analyze_conversation', latencies)
+
+    # Sentiment only, through the batch API
+    start = time.perf_counter()
+    ac.analyze_batch([s for s, _ in texts], [t for _, t in texts])
+    report_stage('analyze_batch', [time.perf_counter() - start], count=len(texts))
+
+    # Dashboard generation, with write_json timed per file
+    write_latencies = []
+    original_write_json = ac.write_json
+
+    def timed_write_json(filename, data, *args, **kwargs):
+        start = time.perf_counter()
+        entry = original_write_json(filename, data, *args, **kwargs)
+        write_latencies.append(time.perf_counter() - start)
+        return entry
+
+    original_output_dir = ac.OUTPUT_DIR
+    with tempfile.TemporaryDirectory() as out_dir:
+        ac.OUTPUT_DIR = out_dir
+        ac.write_json = timed_write_json
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                ac.generate_dashboard_files(conversations, results)
+                generate_time = time.perf_counter() - start
+        finally:
+            ac.write_json = original_write_json
+            ac.OUTPUT_DIR = original_output_dir
+    report_stage('generate_dashboard_files', [generate_time], count=len(texts))
+    report_stage('write_json (per file)', write_latencies)
+
+    total_time = load_time + sum(latencies) + generate_time
+    print()
+    print("  End to end: {:.0f} conversations/sec".format(len(texts) / total_time if total_time else 0))
+    rss = peak_rss_mb()
+    print("  Peak RSS: {}".format('{:.1f} MB'.format(rss) if rss is not None else 'n/a'))
+
+
+# ─── Text Normalization ──────────────────────────────────────────────────────
+
+def legacy_normalize_text(text):
+    """Reference: the original normalize_text (16 sequential str.replace calls)."""
+    text = text.lower()
+    replacements = {
+        'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e',
+        'à': 'a', 'â': 'a', 'ä': 'a',
+        'ù': 'u', 'û': 'u', 'ü': 'u',
+        'ô': 'o', 'ö': 'o',
+        'î': 'i', 'ï': 'i',
+        'ç': 'c', 'œ': 'oe',
+    }
+    for fr_char, en_char in replacements.items():
+        text = text.replace(fr_char, en_char)
+    return text
+
+
+def _best_time(func, texts, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            func(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_normalize(texts, repeat):
+    """Compare normalize_text against the legacy implementation on texts."""
+    chars = sum(len(t) for t in texts)
+    print("  Corpus: {} texts, {:.1f} MB".format(len(texts), chars / 1e6))
+
+    timings = {}
+    for name, func in (('legacy', legacy_normalize_text), ('current', ac.normalize_text)):
+        timings[name] = _best_time(func, texts, repeat)
+        print("  {:<8} {:8.1f} ms  {:7.1f} MB/s".format(
+            name, timings[name] * 1000, chars / timings[name] / 1e6 if timings[name] else 0))
+    print("  Speedup: {:.2f}x".format(timings['legacy'] / timings['current'] if timings['current'] else 0))
+
+    # The current fold table is a superset (ÿ, æ); report texts where that matters
+    changed = sum(1 for t in texts if legacy_normalize_text(t) != ac.normalize_text(t))
+    print("  Texts normalized differently: {}".format(changed))
+
+
+# ─── Main ────────────────────────────────────────────────────────────────────
+
+def load_texts(path, limit):
+    texts = []
+    for conv in ac.iter_conversations(path, limit):
+        texts.append(conv.get('summary', '') or '')
+        texts.extend(ac.speaker_transcripts(conv))
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DPD VOC pipeline benchmarks')
+    parser.add_argument('benchmark', choices=['pipeline', 'normalize'])
+    parser.add_argument('--input',
+                        help='conversations export to use instead of synthetic data '
+                             '(normalize defaults to the pipeline INPUT_FILE)')
+    parser.add_argument('--limit', type=int, default=ac.MAX_CONVERSATIONS,
+                        help='maximum number of conversations to load from --input')
+    parser.add_argument('--conversations', type=int, default=2000,
+                        help='number of synthetic conversations')
+    parser.add_argument('--transcript-words', type=int, default=600,
+                        help='maximum transcript length of synthetic conversations, in words')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='random seed for synthetic conversations')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='normalize: timing runs per implementation (best is reported)')
+    parser.add_argument('--profile', metavar='FILE',
+                        help='pipeline: dump a profile of the scoring stage to FILE')
+    parser.add_argument('--profiler', choices=['cprofile', 'pyinstrument'], default='cprofile',
+                        help='profiler used with --profile')
+    args = parser.parse_args()
+
+    if args.profile and args.profiler == 'pyinstrument':
+        try:
+            import pyinstrument  # noqa: F401
+        except ImportError:
+            parser.error('--profiler pyinstrument requires the pyinstrument package')
+
+    print("=" * 60)
+    print("  DPD VOC - Benchmark: {}".format(args.benchmark))
+    print("=" * 60)
+
+    if args.benchmark == 'normalize':
+        texts = load_texts(args.input or ac.INPUT_FILE, args.limit)
+        bench_normalize(texts, args.repeat)
+        return
+
+    if args.input:
+        bench_pipeline(args.input, args.limit, args.profile, args.profiler)
+        return
+
+    # Synthetic data goes through a real file so the load stage is measured too
+    conversations = generate_conversations(args.conversations, args.transcript_words, seed=args.seed)
+    with tempfile.NamedTemporaryFile('w', suffix='.json', encoding='utf-8', delete=False) as f:
+        json.dump(conversations, f, ensure_ascii=False)
+        path = f.name
+    del conversations
+    try:
+        bench_pipeline(path, None, args.profile, args.profiler)
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+DPD VOC Sentiment Analysis - HTTP Service
+Long-running scorer: the lexicons are compiled once at startup and stay
+warm, and the dashboard files are served live from the conversations
+analyzed so far instead of from static _dpd.json files.
+
+Usage:
+    python scripts/serve.py [--host HOST] [--port PORT] [--input FILE] [--limit N]
+                            [--transcript-budget CHARS]
+
+Endpoints:
+    POST /analyze           one conversation {"summary", "transcript_speaker_1", "transcript_speaker_2",
+                            ..., "audio_duration"}
+    POST /analyze/batch     a JSON list of conversations
+    GET  /mocked-api/FILE   live dashboard file (same names as the batch output)
+    GET  /metrics           Prometheus metrics of the requests scored so far
+    GET  /health
+
+Analyzed conversations are added to the live dashboard unless the request
+has ?record=false. Responses include the per-speaker scores and the
+customer's sentiment trajectory.
+"""
+
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import analyze_conversations as ac
+
+
+# ─── Live Dashboard State ────────────────────────────────────────────────────
+
+class LiveDashboard:
+    """Analyzed conversations plus the dashboard files derived from them.
+
+    Files are rebuilt lazily on the first read after a change.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.conversations = []
+        self.results = []
+        self.aggregates = ac.DashboardAggregates()
+        self._files = None
+
+    def add(self, scored):
+        """Record analyzed (ConversationRecord, ConversationResult) pairs,
+        already validated by analyze_item(). Returns their dashboard ids."""
+        with self._lock:
+            ids = []
+            for record, result in scored:
+                record.summary = record.summary[:ac.PAGE_SUMMARY_CHARS]
+                self.aggregates.add(result, record.audio_duration, record.date)
+                self.conversations.append(record)
+                self.results.append(result)
+                ids.append('conv_{:05d}'.format(len(self.results)))
+            self._files = None
+            return ids
+
+    def file(self, filename):
+        """Encoded JSON for a dashboard file, or None if there is no such file."""
+        with self._lock:
+            if self._files is None:
+                files = self.aggregates.to_dashboard_files()
+                files.update(ac.iter_conversation_files(self.conversations, self.results))
+                self._files = {name: (data, None) for name, data in files.items()}
+            if filename not in self._files:
+                return None
+            data, encoded = self._files[filename]
+            if encoded is None:
+                encoded = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                self._files[filename] = (data, encoded)
+            return encoded
+
+
+def analyze_item(item, budget=None):
+    """Validate and score one request item. Returns its ConversationRecord,
+    ConversationResult and JSON response (with scores).
+
+    An item without transcript_speaker_N fields may send the customer's
+    transcript as "transcript". Raises ValueError for an invalid item.
+    """
+    if not isinstance(item, dict):
+        raise ValueError('a conversation must be a JSON object')
+    record = ac.ConversationRecord.from_conversation(item)
+    for field, value in item.items():
+        if (field == 'transcript' or ac.TRANSCRIPT_FIELD_RE.match(field)) and \
+                value is not None and not isinstance(value, str):
+            raise ValueError('{} must be a string'.format(field))
+    transcripts = ac.speaker_transcripts(item)
+    if not any(transcripts):
+        transcripts = (item.get('transcript', '') or '',)
+    result, neg_score, pos_score = ac.analyze_conversation(record.summary, transcripts, budget=budget)
+    return record, result, dict(result.to_dict(), neg_score=neg_score, pos_score=pos_score)
+
+
+# ─── HTTP Handler ────────────────────────────────────────────────────────────
+
+class AnalysisHandler(BaseHTTPRequestHandler):
+    dashboard = None  # LiveDashboard, set by main()
+    budget = None     # TranscriptBudget for request scoring, set by main()
+
+    def _send_json(self, status, body, content_type='application/json; charset=utf-8'):
+        payload = body if isinstance(body, bytes) else json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.end_headers()
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/health':
+            self._send_json(200, {'status': 'ok', 'conversations': len(self.dashboard.results)})
+        elif path == '/metrics':
+            self._send_json(200, ac.METRICS.to_prometheus().encode('utf-8'), 'text/plain; version=0.0.4')
+        elif path.startswith('/mocked-api/'):
+            encoded = self.dashboard.file(path[len('/mocked-api/'):])
+            if encoded is None:
+                self._send_json(404, {'error': 'unknown dashboard file'})
+            else:
+                self._send_json(200, encoded)
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        record = parse_qs(url.query).get('record', ['true'])[0].lower() not in ('0', 'false', 'no')
+        try:
+            body = self._read_json()
+            if url.path == '/analyze':
+                items = [body]
+            elif url.path == '/analyze/batch':
+                if not isinstance(body, list):
+                    raise ValueError('/analyze/batch expects a JSON list')
+                items = body
+            else:
+                self._send_json(404, {'error': 'not found'})
+                return
+            # Every item is validated and scored before any is recorded, so
+            # a bad item rejects the whole request
+            scored = [analyze_item(item, self.budget) for item in items]
+        except (ValueError, TypeError) as e:  # ValueError includes json.JSONDecodeError
+            self._send_json(400, {'error': str(e)})
+            return
+        responses = [response for _, _, response in scored]
+        for _, result, response in scored:
+            ac.record_result(result, response['neg_score'], response['pos_score'])
+        if record:
+            ids = self.dashboard.add((conv, result) for conv, result, _ in scored)
+            for response, conversation_id in zip(responses, ids):
+                response['id'] = conversation_id
+        self._send_json(200, responses[0] if url.path == '/analyze' else responses)
+
+
+# ─── Main ────────────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description='DPD VOC sentiment analysis HTTP service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--input', help='conversations export to analyze at startup')
+    parser.add_argument('--limit', type=int, default=ac.MAX_CONVERSATIONS,
+                        help='maximum number of conversations to load from --input')
+    parser.add_argument('--transcript-budget', type=int, metavar='CHARS',
+                        help='scan at most about CHARS characters of each request transcript '
+                             '(bounds the latency of very long calls)')
+    args = parser.parse_args()
+    try:
+        budget = ac.TranscriptBudget(args.transcript_budget) if args.transcript_budget else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    ac.METRICS.set('voc_lexicon_info', 1, version=ac.LEXICON_VERSION, hash=ac.LEXICON_HASH)
+    dashboard = LiveDashboard()
+    if args.input:
+        print("  Analyzing {} ...".format(args.input))
+        for conv in ac.iter_conversations(args.input, args.limit):
+            record, result, response = analyze_item(conv)
+            ac.record_result(result, response['neg_score'], response['pos_score'])
+            dashboard.add([(record, result)])
+        print("  Loaded {} conversations".format(len(dashboard.results)))
+
+    AnalysisHandler.dashboard = dashboard
+    AnalysisHandler.budget = budget
+    server = ThreadingHTTPServer((args.host, args.port), AnalysisHandler)
+    print("  Listening on http://{}:{}".format(args.host, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Tests of the analysis pipeline's command line and input handling.
+
+Run from the project root with: python -m unittest discover scripts/tests
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import analyze_conversations as ac  # noqa: E402
+
+
+def run_main(*argv):
+    """Run main() with argv; returns its exit code (0 without SystemExit)."""
+    with mock.patch.object(sys, 'argv', ['analyze_conversations.py', *argv]), \
+            contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        try:
+            ac.main()
+        except SystemExit as e:
+            return e.code
+    return 0
+
+
+class CommandLineTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.output_dir = os.path.join(tmp.name, 'mocked-api')
+        patcher = mock.patch.object(ac, 'OUTPUT_DIR', self.output_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_zero_workers_is_rejected(self):
+        self.assertNotEqual(run_main('--workers', '0'), 0)
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, ac.GENERATIONS_DIR)))
+
+    def test_non_positive_chunk_size_is_rejected(self):
+        for size in ('0', '-5'):
+            self.assertNotEqual(run_main('--chunk-size', size), 0)
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, ac.GENERATIONS_DIR)))
+
+
+class TimestampTest(unittest.TestCase):
+
+    def test_readable_timestamps(self):
+        self.assertEqual(ac.parse_timestamp('2025-03-04T10:00:00Z'), '2025-03-04')
+        self.assertEqual(ac.parse_timestamp(1741082400000), '2025-03-04')
+        self.assertEqual(ac.parse_timestamp({'$date': '2025-03-04T10:00:00Z'}), '2025-03-04')
+        self.assertEqual(ac.parse_timestamp({'$date': {'$numberLong': '1741082400000'}}), '2025-03-04')
+
+    def test_unreadable_timestamps_are_none(self):
+        for value in (['x'], {'a': 1}, {'$date': ['2025-03-04']}, {'$date': {'x': 1}}, True, 'soon'):
+            self.assertIsNone(ac.parse_timestamp(value), value)
+
+    def test_conversation_with_list_timestamp_is_undated(self):
+        record = ac.ConversationRecord.from_conversation({'summary': 'colis', 'created_at': ['x']})
+        self.assertIsNone(record.date)
+
+
+class JsonArrayReaderTest(unittest.TestCase):
+
+    def read(self, text, chunk_size=4):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8') as f:
+            f.write(text)
+        self.addCleanup(os.remove, f.name)
+        with mock.patch.object(ac, 'READ_CHUNK_SIZE', chunk_size):
+            return list(ac.iter_conversations(f.name))
+
+    def test_valid_arrays(self):
+        self.assertEqual(self.read('[]'), [])
+        self.assertEqual(self.read(' [ ] \n'), [])
+        self.assertEqual(self.read('[{"a": "xyzzy"}, 12, "b" ,\n[1, 2]]\n'), [{'a': 'xyzzy'}, 12, 'b', [1, 2]])
+
+    def test_elements_cut_at_any_chunk_size(self):
+        text = '[{"s": "\\u00e9t\\u00e9"}, 1e5, -2.5E-3, 10, true, null, "\\"]"]'
+        for chunk_size in range(1, 12):
+            self.assertEqual(self.read(text, chunk_size),
+                             [{'s': 'été'}, 1e5, -2.5e-3, 10, True, None, '"]'], chunk_size)
+
+    def test_bad_separators_are_rejected(self):
+        for text in ('[1 2]', '[1,,2]', '[,1]', '[1,]', '["a" "b"]'):
+            with self.assertRaises(ValueError, msg=text):
+                self.read(text)
+
+    def test_data_after_the_array_is_rejected(self):
+        for text in ('[1] 2', '[]x', '[1]\n\n]'):
+            with self.assertRaises(ValueError, msg=text):
+                self.read(text)
+
+    def test_malformed_element_and_truncated_file(self):
+        for text in ('[1, {"a": nope}, 2]', '[1, {"a": 2'):
+            with self.assertRaises(ValueError, msg=text):
+                self.read(text)
+
+
+class PhraseMatcherArtifactTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(ac, 'COMPILED_LEXICON_DIR', tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.text = ac.normalize_text('Colis en retard, client très mécontent')
+        self.expected = ac.load_phrase_matcher(rebuild=True).scan(self.text)
+
+    def assert_rebuilt(self, content):
+        with open(ac.phrase_matcher_path(), 'wb') as f:
+            f.write(content)
+        self.assertEqual(ac.load_phrase_matcher().scan(self.text), self.expected)
+        with open(ac.phrase_matcher_path(), 'rb') as f:
+            self.assertNotEqual(f.read(), content)
+
+    def test_unreadable_artifacts_are_rebuilt(self):
+        with open(ac.phrase_matcher_path(), 'rb') as f:
+            artifact = f.read()
+        self.assert_rebuilt(artifact[:len(artifact) // 2])
+        self.assert_rebuilt(b'not a pickle')
+        self.assert_rebuilt(ac.pickle.dumps(['x']))
+        self.assert_rebuilt(ac.pickle.dumps({'tables': {}, 'targets': {}, 'implied': {}, 'pattern': '('}))
+
+    def test_artifact_of_other_tables_is_rebuilt(self):
+        state = ac.load_phrase_matcher().__getstate__()
+        state['tables'] = dict(state['tables'], keywords=[])
+        self.assert_rebuilt(ac.pickle.dumps(state))
+
+
+if __name__ == '__main__':
+    unittest.main()
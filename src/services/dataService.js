@@ -7,76 +7,266 @@
 // It ensures fetch paths resolve correctly regardless of where the app is hosted.
 const BASE = import.meta.env.BASE_URL;
 
+// The pipeline publishes each run as an output generation: its files live
+// under manifest_dpd.json's `path` and the manifest is swapped atomically.
+// Reading every file through the same manifest keeps KPIs, timeline and
+// conversations from one run. Files are requested as <name>.gz (decompressed
+// in the browser); without a manifest or DecompressionStream, the plain
+// top-level JSON file is fetched. Top-level files are replaced one at a
+// time, so that fallback can mix files of two runs while one is published.
+let manifestPromise = null;
+
+function getManifest() {
+  if (!manifestPromise) {
+    manifestPromise = fetch(`${BASE}mocked-api/manifest_dpd.json`, { cache: 'no-cache' })
+      .then(response => (response.ok ? response.json() : null))
+      .catch(() => null);
+  }
+  return manifestPromise;
+}
+
+async function fetchGenerationFile(manifest, name) {
+  const entry = manifest?.files?.[name];
+  if (!entry) return null;
+  const url = `${BASE}mocked-api/${manifest.path}${name}`;
+  if (entry.gz && typeof DecompressionStream !== 'undefined') {
+    const response = await fetch(`${url}.gz`);
+    if (!response.ok) return null;
+    const bytes = new Uint8Array(await response.arrayBuffer());
+    // Some hosts serve .gz files with Content-Encoding: gzip; the browser
+    // has then already decompressed them
+    const gzipped = bytes[0] === 0x1f && bytes[1] === 0x8b;
+    const body = gzipped
+      ? new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'))
+      : new Blob([bytes]).stream();
+    return JSON.parse(await new Response(body).text());
+  }
+  const response = await fetch(url);
+  return response.ok ? await response.json() : null;
+}
+
+async function fetchJson(name) {
+  let data = await fetchGenerationFile(await getManifest(), name);
+  if (data === null && manifestPromise && (await manifestPromise)) {
+    // The generation was pruned by a later run: move to the current one
+    manifestPromise = null;
+    data = await fetchGenerationFile(await getManifest(), name);
+  }
+  if (data !== null) return data;
+  const response = await fetch(`${BASE}mocked-api/${name}`);
+  return await response.json();
+}
+
+// Conversations are split into page files listed by a compact index.
+// Both are fetched once and kept for the lifetime of the app.
+let conversationIndexPromise = null;
+const conversationPages = new Map();
+let filterIndexPromise = null;
+
+// Intersect two sorted position arrays
+function intersectSorted(a, b) {
+  const out = [];
+  let i = 0;
+  let j = 0;
+  while (i < a.length && j < b.length) {
+    if (a[i] === b[j]) {
+      out.push(a[i]);
+      i++;
+      j++;
+    } else if (a[i] < b[j]) {
+      i++;
+    } else {
+      j++;
+    }
+  }
+  return out;
+}
+
+// Union of sorted position arrays
+function unionSorted(lists) {
+  if (lists.length === 1) return lists[0];
+  return [...new Set(lists.flat())].sort((a, b) => a - b);
+}
+
 export const dataService = {
   /**
    * Fetch global statistics
    */
   async getStats() {
-    const response = await fetch(`${BASE}mocked-api/stats_dpd.json`);
-    return await response.json();
+    return fetchJson('stats_dpd.json');
   },
 
   /**
    * Fetch word cloud data (aggregated keywords)
    */
   async getWordCloud() {
-    const response = await fetch(`${BASE}mocked-api/word-cloud_dpd.json`);
-    return await response.json();
+    return fetchJson('word-cloud_dpd.json');
   },
 
   /**
    * Fetch timeline data (monthly volume and satisfaction)
    */
   async getTimeline() {
-    const response = await fetch(`${BASE}mocked-api/timeline_dpd.json`);
-    return await response.json();
+    return fetchJson('timeline_dpd.json');
+  },
+
+  /**
+   * Fetch rolling 7/30-day windows and daily/weekly series (dated conversations only)
+   */
+  async getTimeWindows() {
+    return fetchJson('time-windows_dpd.json');
   },
 
   /**
    * Fetch themes aggregation data
    */
   async getThemes() {
-    const response = await fetch(`${BASE}mocked-api/themes_dpd.json`);
-    return await response.json();
+    return fetchJson('themes_dpd.json');
+  },
+
+  /**
+   * Fetch the conversations index: one light row per conversation
+   * ({ position, id, date, sentiment, themes, site }) plus page metadata
+   */
+  async getConversationIndex() {
+    if (!conversationIndexPromise) {
+      conversationIndexPromise = fetchJson('conversations-index_dpd.json')
+        .then(index => ({
+          total: index.total,
+          pageSize: index.page_size,
+          pages: index.pages,
+          rows: index.rows.map(([id, date, sentiment, themes, site], position) => ({
+            position,
+            id,
+            date,
+            sentiment: index.values.sentiment[sentiment],
+            themes: themes.map(t => index.values.themes[t]),
+            site: index.values.site[site]
+          }))
+        }))
+        .catch(error => {
+          conversationIndexPromise = null;
+          throw error;
+        });
+    }
+    return conversationIndexPromise;
+  },
+
+  /**
+   * Fetch one page of full conversation entries (cached)
+   */
+  async getConversationPage(page) {
+    if (!conversationPages.has(page)) {
+      const index = await this.getConversationIndex();
+      const request = fetchJson(index.pages[page])
+        .catch(error => {
+          conversationPages.delete(page);
+          throw error;
+        });
+      conversationPages.set(page, request);
+    }
+    return conversationPages.get(page);
+  },
+
+  /**
+   * Fetch full conversation entries for index rows, loading only the pages they live on
+   */
+  async getConversationsForRows(rows) {
+    const index = await this.getConversationIndex();
+    const pageOf = row => Math.floor(row.position / index.pageSize);
+    const pages = [...new Set(rows.map(pageOf))];
+    const loaded = new Map(await Promise.all(
+      pages.map(async page => [page, await this.getConversationPage(page)])
+    ));
+    return rows.map(row => loaded.get(pageOf(row))[row.position % index.pageSize]);
+  },
+
+  /**
+   * Fetch the filter index: { total, postings: { field: { value: Int32Array } } }
+   * with sorted conversation positions per sentiment, theme, keyword, site,
+   * agent_id and month
+   */
+  async getFilterIndex() {
+    if (!filterIndexPromise) {
+      filterIndexPromise = fetchJson('filter-index_dpd.json')
+        .then(index => {
+          const postings = {};
+          for (const [field, byValue] of Object.entries(index.postings)) {
+            postings[field] = {};
+            for (const [value, deltas] of Object.entries(byValue)) {
+              const positions = new Int32Array(deltas.length);
+              let position = 0;
+              deltas.forEach((delta, i) => {
+                position += delta;
+                positions[i] = position;
+              });
+              postings[field][value] = positions;
+            }
+          }
+          return { total: index.total, postings };
+        })
+        .catch(error => {
+          filterIndexPromise = null;
+          throw error;
+        });
+    }
+    return filterIndexPromise;
+  },
+
+  /**
+   * Positions of the conversations matching filters, e.g.
+   * { sentiment: ['negative'], site: ['Paris'], month: ['2025-03', '2025-04'] }.
+   * Values of one field are OR-ed, fields are AND-ed. Returns null when no
+   * filter is active (everything matches).
+   */
+  async queryConversations(filters) {
+    const index = await this.getFilterIndex();
+    const lists = [];
+    for (const [field, values] of Object.entries(filters)) {
+      if (!values || values.length === 0) continue;
+      const byValue = index.postings[field] || {};
+      lists.push(unionSorted(values.map(value => Array.from(byValue[value] || []))));
+    }
+    if (lists.length === 0) return null;
+    // Start from the shortest list so intermediate results stay small
+    lists.sort((a, b) => a.length - b.length);
+    return lists.reduce(intersectSorted);
   },
 
   /**
-   * Fetch conversations/verbatims list
+   * Fetch the full conversations/verbatims list (all pages)
    */
   async getConversations() {
-    const response = await fetch(`${BASE}mocked-api/conversations_dpd.json`);
-    return await response.json();
+    const index = await this.getConversationIndex();
+    const pages = await Promise.all(index.pages.map((_, page) => this.getConversationPage(page)));
+    return pages.flat();
   },
 
   /**
    * Fetch KPI metrics
    */
   async getKPIs() {
-    const response = await fetch(`${BASE}mocked-api/kpis_dpd.json`);
-    return await response.json();
+    return fetchJson('kpis_dpd.json');
   },
 
   /**
    * Fetch prioritization matrix data
    */
   async getPrioritizationMatrix() {
-    const response = await fetch(`${BASE}mocked-api/prioritization-matrix_dpd.json`);
-    return await response.json();
+    return fetchJson('prioritization-matrix_dpd.json');
   },
 
   /**
    * Fetch site performance data (V2)
    */
   async getSitePerformance() {
-    const response = await fetch(`${BASE}mocked-api/site-performance_dpd.json`);
-    return await response.json();
+    return fetchJson('site-performance_dpd.json');
   },
 
   /**
    * Fetch channel comparison data (V2)
    */
   async getChannelComparison() {
-    const response = await fetch(`${BASE}mocked-api/channel-comparison_dpd.json`);
-    return await response.json();
+    return fetchJson('channel-comparison_dpd.json');
   }
 };